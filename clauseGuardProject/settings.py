@@ -33,7 +33,19 @@ DEBUG = os.getenv('DEBUG', 'False').lower() in ('1', 'true', 'yes')
 GROQ_API_KEY = os.getenv('GROQ_API_KEY', '')
 CONTRACT_ANALYSIS_TIMEOUT = int(os.getenv('CONTRACT_ANALYSIS_TIMEOUT', '300'))
 CONTRACT_MAX_FILE_SIZE = int(os.getenv('CONTRACT_MAX_FILE_SIZE', '10485760'))
+# Contract analyses run at once per process; further uploads queue
+ANALYSIS_MAX_WORKERS = int(os.getenv('ANALYSIS_MAX_WORKERS', '4'))
 CHROMA_DATA_DIR = os.getenv('CHROMA_DATA_DIR', str(BASE_DIR / 'chroma_data'))
+# Clauses sent to ChromaDB per add()/delete() call (capped at the client's maximum)
+CHROMA_BULK_BATCH_SIZE = int(os.getenv('CHROMA_BULK_BATCH_SIZE', '5000'))
+# Clause rows per Clause.objects.bulk_create() INSERT (database, not ChromaDB)
+CLAUSE_BULK_BATCH_SIZE = int(os.getenv('CLAUSE_BULK_BATCH_SIZE', '1000'))
+# Load the embedding model in the background when the shared ChromaManager is
+# created. Off by default so tests and management commands don't start a model
+# load; set CHROMA_WARM_UP=1 in the web server's environment.
+CHROMA_WARM_UP = os.getenv('CHROMA_WARM_UP', 'False').lower() in ('1', 'true', 'yes')
+# Seconds identical LLM requests are answered from the Django cache (0 disables)
+LLM_CACHE_TIMEOUT = int(os.getenv('LLM_CACHE_TIMEOUT', '86400'))
 
 
 # Quick-start development settings - unsuitable for production
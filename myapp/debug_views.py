@@ -7,16 +7,138 @@ URLs:
     /api/debug/chromadb/search/    - Test search functionality
 """
 
-from django.http import JsonResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views.decorators.http import require_http_methods
 import json
-
-from myapp.services.chroma_manager import ChromaManager, CHROMADB_AVAILABLE
-from myapp.services.contract_clause_mapping import ContractClauseMapper
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from myapp.services.chroma_manager import (
+    get_chroma_manager,
+    distances_to_similarities,
+    text_preview,
+    CHROMADB_AVAILABLE,
+    CHROMA_ERRORS,
+)
+from myapp.services.contract_clause_mapping import clauses_for_chroma, get_mapper
 from django.conf import settings
 import os
 
+# Use orjson for faster (de)serialization when installed, stdlib json otherwise
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Upper bound on collections counted concurrently
+COUNT_MAX_WORKERS = 8
+
+# Seconds to skip a collection after reading it failed, so repeated
+# diagnostics requests don't keep hitting a broken or recovering store
+BAD_COLLECTION_TTL = 30
+
+# Collections whose last read failed: name -> (time.monotonic(), error message)
+_bad_collections = {}
+
+
+class OrjsonResponse(HttpResponse):
+    """
+    Drop-in replacement for django.http.JsonResponse for dict payloads.
+    
+    Serializes with orjson when it is available, which is several times
+    faster than the stdlib encoder on the nested diagnostics payloads.
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=_dumps(data), **kwargs)
+
+
+def _dumps(data):
+    """Serialize data to JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+
+
+def _recent_failure(collection_name):
+    """Return the error message if reading this collection failed within BAD_COLLECTION_TTL"""
+    failure = _bad_collections.get(collection_name)
+    if failure is None:
+        return None
+    failed_at, message = failure
+    if time.monotonic() - failed_at < BAD_COLLECTION_TTL:
+        return message
+    _bad_collections.pop(collection_name, None)
+    return None
+
+
+def _loads(body):
+    """Parse a JSON request body (orjson.JSONDecodeError subclasses json.JSONDecodeError)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _count_collection(chroma, collection_name):
+    """
+    Count the documents stored in one collection.
+    
+    Returns:
+        Tuple of (count, error message). Count is -1 if the collection
+        can't be read, and error is None on success.
+    """
+    error = _recent_failure(collection_name)
+    if error is not None:
+        return -1, error
+
+    collection = chroma.get_or_create_collection(collection_name)
+    if not collection:
+        return 0, None
+
+    try:
+        return collection.count(), None
+    except CHROMA_ERRORS as e:
+        _bad_collections[collection_name] = (time.monotonic(), str(e))
+        return -1, str(e)
+
+
+# Per-collection document counts straight from ChromaDB's SQLite metadata
+# segment, without going through the ChromaDB client
+_SQLITE_COUNTS_QUERY = """
+    SELECT c.name, COUNT(e.id)
+    FROM collections c
+    LEFT JOIN segments s ON s.collection = c.id AND s.scope = 'METADATA'
+    LEFT JOIN embeddings e ON e.segment_id = s.id
+    GROUP BY c.id, c.name
+"""
+
+
+def _chroma_sqlite_stats(sqlite_file):
+    """
+    Read per-collection document counts from chroma.sqlite3 read-only.
+    
+    Returns:
+        Dict of collection name -> document count, or None if the file
+        can't be read or its schema isn't the one this query expects
+        (callers then fall back to counting through ChromaManager)
+    """
+    try:
+        conn = sqlite3.connect(f'file:{sqlite_file}?mode=ro', uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        return dict(conn.execute(_SQLITE_COUNTS_QUERY).fetchall())
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
 
 @login_required(login_url='login')
 @require_http_methods(["GET"])
@@ -30,7 +152,7 @@ def chromadb_diagnostics(request):
         {
             "status": "success",
             "chromadb_available": true,
-            "chroma_initialized": true,
+            "chroma_initialized": true,  # only when counted through ChromaManager
             "chroma_path": "/path/to/chroma_data",
             "database_exists": true,
             "database_size_kb": 123.45,
@@ -54,11 +176,7 @@ def chromadb_diagnostics(request):
         if not CHROMADB_AVAILABLE:
             result["chromadb_available"] = False
             result["message"] = "ChromaDB not installed. Install with: pip install chromadb"
-            return JsonResponse(result)
-
-        # Initialize ChromaManager
-        chroma = ChromaManager()
-        result["diagnostics"]["chroma_initialized"] = chroma.available
+            return OrjsonResponse(result)
 
         # Get persistence directory
         persist_dir = getattr(
@@ -71,58 +189,142 @@ def chromadb_diagnostics(request):
 
         # Check database file
         sqlite_file = os.path.join(persist_dir, 'chroma.sqlite3')
-        result["diagnostics"]["database_exists"] = os.path.exists(sqlite_file)
-        if result["diagnostics"]["database_exists"]:
-            size_kb = os.path.getsize(sqlite_file) / 1024
-            result["diagnostics"]["database_size_kb"] = round(size_kb, 2)
+        sqlite_stats = None
+        try:
+            # One stat() call gives both existence and size
+            sqlite_stat = os.stat(sqlite_file)
+        except FileNotFoundError:
+            result["diagnostics"]["database_exists"] = False
+        else:
+            result["diagnostics"]["database_exists"] = True
+            result["diagnostics"]["database_size_kb"] = round(sqlite_stat.st_size / 1024, 2)
+            sqlite_stats = _chroma_sqlite_stats(sqlite_file)
 
         # Load standard clauses
-        mapper = ContractClauseMapper()
+        mapper = get_mapper()
         contract_types = mapper.get_all_contract_types()
         result["diagnostics"]["contract_types_count"] = len(contract_types)
         result["diagnostics"]["contract_types"] = contract_types
 
-        # Check each collection
+        # Nothing to check without contract types
+        if not contract_types:
+            result["diagnostics"]["standard_clauses"] = {}
+            return OrjsonResponse(result)
+
+        splits = mapper.get_contract_type_splits()
+        if sqlite_stats is not None:
+            # All counts came from one read-only query
+            counts = [(sqlite_stats.get(split[0], 0), None) for split in splits]
+        else:
+            # The SQLite file is missing or unreadable; count through
+            # ChromaManager, which is only built here since it loads the
+            # embedding stack
+            chroma = get_chroma_manager()
+            result["diagnostics"]["chroma_initialized"] = chroma.available
+            # Count each collection concurrently; the reads are independent
+            max_workers = min(COUNT_MAX_WORKERS, len(splits))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                counts = list(executor.map(
+                    lambda split: _count_collection(chroma, split[0]),
+                    splits
+                ))
+
         standard_clauses_info = {}
-        for contract_type_key in contract_types:
+        for (contract_type_key, contract_type, jurisdiction), (chromadb_count, error) in zip(splits, counts):
             # Get total clauses from JSON
-            parts = contract_type_key.rsplit('_', 1)
-            if len(parts) == 2:
-                contract_type, jurisdiction = parts
-            else:
-                contract_type = contract_type_key
-                jurisdiction = 'INDIA'
-
             all_clauses = mapper.get_all_clauses_flat(contract_type, jurisdiction)
-            
-            # Check how many are in ChromaDB
-            collection = chroma.get_or_create_collection(contract_type_key)
-            chromadb_count = 0
-            
-            if collection:
-                try:
-                    result_data = collection.get()
-                    chromadb_count = len(result_data['ids']) if result_data['ids'] else 0
-                except:
-                    chromadb_count = 0
 
             standard_clauses_info[contract_type_key] = {
                 "total_in_json": len(all_clauses),
                 "stored_in_chromadb": chromadb_count,
-                "percentage": round((chromadb_count / len(all_clauses) * 100) if all_clauses else 0, 1)
+                "percentage": round((chromadb_count / len(all_clauses) * 100) if all_clauses and chromadb_count > 0 else 0, 1)
             }
+            if error is not None:
+                standard_clauses_info[contract_type_key]["error"] = error
 
         result["diagnostics"]["standard_clauses"] = standard_clauses_info
 
-        return JsonResponse(result)
+        return OrjsonResponse(result)
 
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             "status": "error",
             "message": str(e)
         }, status=500)
 
 
+def _collection_info(chroma, contract_type_key):
+    """
+    Build the listing entry for one collection.
+    
+    Returns:
+        Dict with document count and sample documents, a dict with an
+        "error" key if reading the collection failed, or None if the
+        collection is not accessible
+    """
+    error = _recent_failure(contract_type_key)
+    if error is not None:
+        return {
+            "error": error
+        }
+
+    collection = chroma.get_or_create_collection(contract_type_key)
+    if not collection:
+        return None
+
+    try:
+        # Only fetch the sample rows, without their embeddings;
+        # count() avoids loading the rest
+        result_data = collection.get(limit=5, include=['documents', 'metadatas'])
+        rows = zip(
+            result_data.get('ids') or (),
+            result_data.get('documents') or (),
+            result_data.get('metadatas') or ()
+        )
+        
+        sample_docs = [
+            {
+                "id": id_,
+                "type": metadata.get('type', 'N/A'),
+                "text_preview": text_preview(doc, 100),
+                "jurisdiction": metadata.get('jurisdiction', 'N/A')
+            }
+            for id_, doc, metadata in islice(rows, 5)
+        ]
+
+        return {
+            "document_count": collection.count(),
+            "sample_documents": sample_docs
+        }
+    except CHROMA_ERRORS as e:
+        _bad_collections[contract_type_key] = (time.monotonic(), str(e))
+        return {
+            "error": str(e)
+        }
+
+
+def _stream_collections(chroma, contract_types):
+    """
+    Yield the collections listing as JSON, one collection per chunk.
+    
+    "status" is written last so that a failure part-way through still
+    produces a valid document reporting the error.
+    """
+    yield b'{"collections":{'
+    try:
+        first = True
+        for contract_type_key in contract_types:
+            info = _collection_info(chroma, contract_type_key)
+            if info is None:
+                continue
+            yield (b'' if first else b',') + _dumps(contract_type_key) + b':' + _dumps(info)
+            first = False
+    except Exception as e:
+        yield b'},"status":"error","message":' + _dumps(str(e)) + b'}'
+    else:
+        yield b'},"status":"success"}'
+
+
 @login_required(login_url='login')
 @require_http_methods(["GET"])
 def chromadb_collections(request):
@@ -134,7 +336,7 @@ def chromadb_collections(request):
     Query params:
         - collection: specific collection name to inspect
     
-    Returns:
+    Returns (streamed, one collection at a time):
         {
             "status": "success",
             "collections": {
@@ -147,13 +349,13 @@ def chromadb_collections(request):
     """
     try:
         if not CHROMADB_AVAILABLE:
-            return JsonResponse({
+            return OrjsonResponse({
                 "status": "error",
                 "message": "ChromaDB not available"
             }, status=400)
 
-        chroma = ChromaManager()
-        mapper = ContractClauseMapper()
+        chroma = get_chroma_manager()
+        mapper = get_mapper()
         contract_types = mapper.get_all_contract_types()
 
         # If specific collection requested
@@ -161,48 +363,15 @@ def chromadb_collections(request):
         if specific_collection:
             contract_types = [specific_collection] if specific_collection in contract_types else []
 
-        collections_info = {}
-
-        for contract_type_key in contract_types:
-            collection = chroma.get_or_create_collection(contract_type_key)
-            
-            if collection:
-                try:
-                    result_data = collection.get()
-                    
-                    sample_docs = []
-                    for i, (id_, doc, metadata) in enumerate(
-                        zip(
-                            result_data['ids'][:5] if result_data['ids'] else [],
-                            result_data['documents'][:5] if result_data['documents'] else [],
-                            result_data['metadatas'][:5] if result_data['metadatas'] else []
-                        ),
-                        1
-                    ):
-                        sample_docs.append({
-                            "id": id_,
-                            "type": metadata.get('type', 'N/A'),
-                            "text_preview": doc[:100] + "...",
-                            "jurisdiction": metadata.get('jurisdiction', 'N/A')
-                        })
-
-                    doc_count = len(result_data['ids']) if result_data['ids'] else 0
-                    collections_info[contract_type_key] = {
-                        "document_count": doc_count,
-                        "sample_documents": sample_docs
-                    }
-                except Exception as e:
-                    collections_info[contract_type_key] = {
-                        "error": str(e)
-                    }
-
-        return JsonResponse({
-            "status": "success",
-            "collections": collections_info
-        })
+        # Stream one collection at a time so memory stays flat no matter
+        # how many collections there are
+        return StreamingHttpResponse(
+            _stream_collections(chroma, contract_types),
+            content_type='application/json'
+        )
 
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             "status": "error",
             "message": str(e)
         }, status=500)
@@ -240,44 +409,45 @@ def chromadb_test_search(request):
     """
     try:
         if not CHROMADB_AVAILABLE:
-            return JsonResponse({
+            return OrjsonResponse({
                 "status": "error",
                 "message": "ChromaDB not available"
             }, status=400)
 
-        data = json.loads(request.body)
+        data = _loads(request.body)
         query_text = data.get('query', '')
         collection_name = data.get('collection', 'SERVICE_AGREEMENT_INDIA')
         top_k = int(data.get('top_k', 3))
 
         if not query_text:
-            return JsonResponse({
+            return OrjsonResponse({
                 "status": "error",
                 "message": "Query text is required"
             }, status=400)
 
-        chroma = ChromaManager()
+        chroma = get_chroma_manager()
         results = chroma.search_similar_clauses(
             collection_name=collection_name,
             query_text=query_text,
             top_k=top_k
         )
 
-        formatted_results = []
-        for doc, metadata, distance in zip(
-            results['documents'],
-            results['metadatas'],
-            results['distances']
-        ):
-            similarity = 1 - distance if distance else 0  # Convert distance to similarity
-            formatted_results.append({
+        similarities = distances_to_similarities(results['distances'])
+        formatted_results = [
+            {
                 "type": metadata.get('type', 'N/A'),
-                "text_preview": doc[:200] + "...",
+                "text_preview": text_preview(doc, 200),
                 "similarity": round(similarity, 4),
                 "jurisdiction": metadata.get('jurisdiction', 'N/A')
-            })
-
-        return JsonResponse({
+            }
+            for doc, metadata, similarity in zip(
+                results['documents'],
+                results['metadatas'],
+                similarities
+            )
+        ]
+
+        return OrjsonResponse({
             "status": "success",
             "query": query_text,
             "collection": collection_name,
@@ -286,12 +456,12 @@ def chromadb_test_search(request):
         })
 
     except json.JSONDecodeError:
-        return JsonResponse({
+        return OrjsonResponse({
             "status": "error",
             "message": "Invalid JSON"
         }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             "status": "error",
             "message": str(e)
         }, status=500)
@@ -305,72 +475,69 @@ def chromadb_initialize(request):
     
     Endpoint: POST /api/debug/chromadb/initialize/
     
+    Query Parameters:
+        background: "1" to load the clauses on a background thread and
+            return 202 straight away
+    
     Returns:
         {
             "status": "success",
             "clauses_added": 500,
             "collections_initialized": 10
         }
+        
+        or, with background=1:
+        {
+            "status": "accepted",
+            "collections_queued": 10
+        }
     """
     try:
         if not CHROMADB_AVAILABLE:
-            return JsonResponse({
+            return OrjsonResponse({
                 "status": "error",
                 "message": "ChromaDB not available"
             }, status=400)
 
-        chroma = ChromaManager()
-        mapper = ContractClauseMapper()
-        contract_types = mapper.get_all_contract_types()
+        chroma = get_chroma_manager()
+        mapper = get_mapper()
 
-        total_added = 0
-        collections_initialized = 0
-
-        for contract_type_key in contract_types:
-            # Parse contract type and jurisdiction
-            parts = contract_type_key.rsplit('_', 1)
-            if len(parts) == 2:
-                contract_type, jurisdiction = parts
-            else:
-                contract_type = contract_type_key
-                jurisdiction = 'INDIA'
-
-            # Get all clauses for this type
+        clauses_by_collection = {}
+        for contract_type_key, contract_type, jurisdiction in mapper.get_contract_type_splits():
             all_clauses = mapper.get_all_clauses_flat(contract_type, jurisdiction)
+            if all_clauses:
+                clauses_by_collection[contract_type_key] = clauses_for_chroma(
+                    all_clauses, contract_type, jurisdiction
+                )
 
-            if not all_clauses:
-                continue
+        if request.GET.get('background') in ('1', 'true'):
+            chroma.add_standard_clauses_background(clauses_by_collection)
+            return OrjsonResponse({
+                "status": "accepted",
+                "message": f"Loading {len(clauses_by_collection)} collections in the background",
+                "collections_queued": len(clauses_by_collection)
+            }, status=202)
 
-            # Prepare clauses for ChromaDB
-            clauses_for_chroma = []
-            for clause in all_clauses:
-                clauses_for_chroma.append({
-                    'type': clause.get('type', ''),
-                    'text': clause.get('standard_text', clause.get('text', '')),
-                    'jurisdiction': jurisdiction,
-                    'contract_type': contract_type,
-                    'recommendations': clause.get('recommendations', '')
-                })
-
-            try:
-                chroma.add_standard_clauses(
-                    collection_name=contract_type_key,
-                    clauses=clauses_for_chroma
-                )
-                total_added += len(clauses_for_chroma)
+        total_added = 0
+        collections_initialized = 0
+
+        # Collections are filled concurrently; failed ones are skipped. A
+        # collection that was already up to date adds 0 clauses but is ready
+        results = chroma.add_standard_clauses_multi(clauses_by_collection)
+        for added, error in results.values():
+            if error is None:
+                total_added += added
                 collections_initialized += 1
-            except Exception as e:
-                pass  # Continue with next collection
 
-        return JsonResponse({
+        return OrjsonResponse({
             "status": "success",
-            "message": f"Successfully initialized {collections_initialized} collections",
+            "message": f"{collections_initialized} collections ready, {total_added} clauses added",
             "clauses_added": total_added,
             "collections_initialized": collections_initialized
         })
 
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             "status": "error",
             "message": str(e)
         }, status=500)
@@ -5,17 +5,23 @@ Usage:
     python manage.py test_chromadb
     python manage.py test_chromadb --collection SERVICE_AGREEMENT_INDIA
     python manage.py test_chromadb --search "payment terms"
+    python manage.py test_chromadb --compact    (e.g. nightly from cron)
 """
 
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 import os
-import json
 import logging
+from itertools import islice
 
 # Import our services
-from myapp.services.chroma_manager import ChromaManager, CHROMADB_AVAILABLE
-from myapp.services.contract_clause_mapping import ContractClauseMapper
+from myapp.services.chroma_manager import (
+    get_chroma_manager,
+    distances_to_similarities,
+    text_preview,
+    CHROMADB_AVAILABLE,
+)
+from myapp.services.contract_clause_mapping import clauses_for_chroma, get_mapper
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +50,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Initialize/load all standard clauses into ChromaDB',
         )
+        parser.add_argument(
+            '--compact',
+            action='store_true',
+            help='Rebuild every collection from its stored records to keep the index compact',
+        )
 
     def handle(self, *args, **options):
         """Main command handler"""
@@ -66,7 +77,7 @@ class Command(BaseCommand):
         # Initialize ChromaManager
         try:
             self.stdout.write("Initializing ChromaManager...")
-            chroma = ChromaManager()
+            chroma = get_chroma_manager()
             
             if not chroma.available:
                 self.stdout.write(
@@ -84,8 +95,14 @@ class Command(BaseCommand):
         # Initialize ContractClauseMapper
         try:
             self.stdout.write("Loading standard clauses...")
-            mapper = ContractClauseMapper()
+            mapper = get_mapper()
             contract_types = mapper.get_all_contract_types()
+            # Flatten every contract type's clauses once; init and
+            # diagnostics below both work from this
+            flat_clauses = {
+                split: mapper.get_all_clauses_flat(split[1], split[2])
+                for split in mapper.get_contract_type_splits()
+            }
             self.stdout.write(
                 self.style.SUCCESS(f"✓ Loaded {len(contract_types)} contract types\n")
             )
@@ -101,10 +118,14 @@ class Command(BaseCommand):
 
         # Handle --init-clauses option
         if options.get('init_clauses'):
-            self._handle_init_clauses(chroma, mapper, contract_types)
+            self._handle_init_clauses(chroma, flat_clauses)
+
+        # Handle --compact option
+        if options.get('compact'):
+            self._handle_compact(chroma, contract_types)
 
         # Run general diagnostics
-        self._run_diagnostics(chroma, mapper, contract_types)
+        self._run_diagnostics(chroma, mapper, contract_types, flat_clauses)
 
         # Handle --collection option
         if options.get('collection'):
@@ -120,7 +141,7 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.HTTP_INFO("="*80 + "\n"))
 
-    def _run_diagnostics(self, chroma, mapper, contract_types):
+    def _run_diagnostics(self, chroma, mapper, contract_types, flat_clauses):
         """Run general diagnostics"""
         self.stdout.write(self.style.HTTP_INFO("\n📊 DIAGNOSTICS\n"))
 
@@ -139,55 +160,43 @@ class Command(BaseCommand):
             
             # Check for database files
             sqlite_file = os.path.join(persist_dir, 'chroma.sqlite3')
-            if os.path.exists(sqlite_file):
-                size_kb = os.path.getsize(sqlite_file) / 1024
+            try:
+                size_kb = os.stat(sqlite_file).st_size / 1024
+            except FileNotFoundError:
                 self.stdout.write(
-                    self.style.SUCCESS(f"   ✓ Database file found: {size_kb:.2f} KB")
+                    self.style.WARNING(f"   ⚠ No database file found (will be created on first insert)")
                 )
             else:
                 self.stdout.write(
-                    self.style.WARNING(f"   ⚠ No database file found (will be created on first insert)")
+                    self.style.SUCCESS(f"   ✓ Database file found: {size_kb:.2f} KB")
                 )
         else:
             self.stdout.write(self.style.WARNING(f"   ⚠ Directory doesn't exist yet"))
 
+        clause_counts = {
+            contract_type_key: len(clauses)
+            for (contract_type_key, _, _), clauses in flat_clauses.items()
+        }
+
         # 2. Standard Clauses File
         self.stdout.write(f"\n2️⃣  Standard Clauses JSON File:")
         json_path = mapper._get_json_path()
         self.stdout.write(f"   Path: {json_path}")
         
         if os.path.exists(json_path):
-            with open(json_path, 'r') as f:
-                clauses_data = json.load(f)
-            total_clauses = 0
-            for contract_type, data in clauses_data.items():
-                count = (
-                    len(data.get('critical_clauses', [])) +
-                    len(data.get('important_clauses', [])) +
-                    len(data.get('optional_clauses', []))
-                )
-                total_clauses += count
-            
             self.stdout.write(self.style.SUCCESS(f"   ✓ File found"))
-            self.stdout.write(f"   Contract types: {len(clauses_data)}")
-            self.stdout.write(f"   Total clauses: {total_clauses}")
+            self.stdout.write(f"   Contract types: {len(clause_counts)}")
+            self.stdout.write(f"   Total clauses: {sum(clause_counts.values())}")
         else:
             self.stdout.write(self.style.ERROR(f"   ✗ File not found!"))
 
         # 3. Contract Types
-        self.stdout.write(f"\n3️⃣  Supported Contract Types: ({len(contract_types)})")
-        for i, contract_type_key in enumerate(contract_types, 1):
-            # Correctly parse contract type and jurisdiction
-            parts = contract_type_key.rsplit('_', 1)
-            if len(parts) == 2:
-                contract_type, jurisdiction = parts
-            else:
-                contract_type = contract_type_key
-                jurisdiction = 'INDIA'
-            
-            all_clauses = mapper.get_all_clauses_flat(contract_type, jurisdiction)
-            total = len(all_clauses)
-            self.stdout.write(f"   {i}. {contract_type_key}: {total} clauses")
+        lines = [f"\n3️⃣  Supported Contract Types: ({len(contract_types)})"]
+        lines.extend(
+            f"   {i}. {contract_type_key}: {total} clauses"
+            for i, (contract_type_key, total) in enumerate(clause_counts.items(), 1)
+        )
+        self.stdout.write("\n".join(lines))
 
     def _handle_collection(self, chroma, mapper, collection_name):
         """Handle --collection option"""
@@ -206,9 +215,8 @@ class Command(BaseCommand):
 
         # Count documents in collection
         try:
-            # Try to get collection count
-            result = collection.get()
-            doc_count = len(result['ids']) if result['ids'] else 0
+            # Count without materializing every document
+            doc_count = collection.count()
             
             self.stdout.write(f"Collection: {collection_name}")
             self.stdout.write(f"Documents in ChromaDB: {doc_count}")
@@ -217,14 +225,18 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS(f"✓ ChromaDB has {doc_count} clauses stored"))
                 
                 # Show first few documents
-                self.stdout.write(f"\nFirst {min(5, doc_count)} clauses:")
-                for i, (id_, doc, metadata) in enumerate(
-                    zip(result['ids'][:5], result['documents'][:5], result['metadatas'][:5]),
-                    1
-                ):
-                    self.stdout.write(f"\n   {i}. ID: {id_}")
-                    self.stdout.write(f"      Type: {metadata.get('type', 'N/A')}")
-                    self.stdout.write(f"      Text (first 100 chars): {doc[:100]}...")
+                result = collection.get(limit=5, include=['documents', 'metadatas'])
+                lines = [f"\nFirst {min(5, doc_count)} clauses:"]
+                rows = zip(
+                    result.get('ids') or (),
+                    result.get('documents') or (),
+                    result.get('metadatas') or ()
+                )
+                for i, (id_, doc, metadata) in enumerate(islice(rows, 5), 1):
+                    lines.append(f"\n   {i}. ID: {id_}")
+                    lines.append(f"      Type: {metadata.get('type', 'N/A')}")
+                    lines.append(f"      Text (first 100 chars): {text_preview(doc, 100)}")
+                self.stdout.write("\n".join(lines))
             else:
                 self.stdout.write(
                     self.style.WARNING(
@@ -254,11 +266,17 @@ class Command(BaseCommand):
         self.stdout.write(f"Testing with collection: {test_collection}\n")
 
         # Perform search
-        results = chroma.search_similar_clauses(
-            collection_name=test_collection,
-            query_text=query_text,
-            top_k=3
-        )
+        try:
+            results = chroma.search_similar_clauses(
+                collection_name=test_collection,
+                query_text=query_text,
+                top_k=3
+            )
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f"✗ Search failed: {str(e)}")
+            )
+            return
 
         if not results or not results['documents']:
             self.stdout.write(
@@ -268,65 +286,46 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f"✓ Found {len(results['documents'])} similar clauses:\n"))
 
-        for i, (doc, metadata, distance) in enumerate(
-            zip(results['documents'], results['metadatas'], results['distances']),
+        lines = []
+        similarities = distances_to_similarities(results['distances'])
+        for i, (doc, metadata, similarity) in enumerate(
+            zip(results['documents'], results['metadatas'], similarities),
             1
         ):
-            similarity = 1 - distance if distance else 0  # Convert distance to similarity
-            self.stdout.write(f"\n   Match {i} (Similarity: {similarity:.2%}):")
-            self.stdout.write(f"      Type: {metadata.get('type', 'N/A')}")
-            self.stdout.write(f"      Text: {doc[:150]}...")
+            lines.append(f"\n   Match {i} (Similarity: {similarity:.2%}):")
+            lines.append(f"      Type: {metadata.get('type', 'N/A')}")
+            lines.append(f"      Text: {text_preview(doc, 150)}")
+        self.stdout.write("\n".join(lines))
 
-    def _handle_init_clauses(self, chroma, mapper, contract_types):
+    def _handle_init_clauses(self, chroma, flat_clauses):
         """Handle --init-clauses option"""
         self.stdout.write(
             self.style.HTTP_INFO(f"\n⬆️  INITIALIZING CLAUSES IN CHROMADB\n")
         )
 
-        total_added = 0
+        clauses_by_collection = {
+            contract_type_key: clauses_for_chroma(all_clauses, contract_type, jurisdiction)
+            for (contract_type_key, contract_type, jurisdiction), all_clauses in flat_clauses.items()
+            if all_clauses
+        }
 
-        for contract_type_key in contract_types:
-            # Parse contract type and jurisdiction
-            parts = contract_type_key.rsplit('_', 1)
-            if len(parts) == 2:
-                contract_type, jurisdiction = parts
+        # Collections are filled concurrently; report them in the original order
+        results = chroma.add_standard_clauses_multi(clauses_by_collection)
+        total_added = 0
+        for contract_type_key, _, _ in flat_clauses:
+            if contract_type_key not in results:
+                result_line = f"  ⚠ No clauses found"
             else:
-                contract_type = contract_type_key
-                jurisdiction = 'INDIA'
-
-            self.stdout.write(f"\nProcessing {contract_type_key}...")
-
-            # Get all clauses for this type
-            all_clauses = mapper.get_all_clauses_flat(contract_type, jurisdiction)
-
-            if not all_clauses:
-                self.stdout.write(f"  ⚠ No clauses found")
-                continue
-
-            # Prepare clauses for ChromaDB
-            clauses_for_chroma = []
-            for clause in all_clauses:
-                clauses_for_chroma.append({
-                    'type': clause.get('type', ''),
-                    'text': clause.get('standard_text', clause.get('text', '')),
-                    'jurisdiction': jurisdiction,
-                    'contract_type': contract_type,
-                    'recommendations': clause.get('recommendations', '')
-                })
-
-            try:
-                chroma.add_standard_clauses(
-                    collection_name=contract_type_key,
-                    clauses=clauses_for_chroma
-                )
-                total_added += len(clauses_for_chroma)
-                self.stdout.write(
-                    self.style.SUCCESS(f"  ✓ Added {len(clauses_for_chroma)} clauses")
-                )
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f"  ✗ Error: {str(e)}")
-                )
+                added, error = results[contract_type_key]
+                if error is not None:
+                    result_line = self.style.ERROR(f"  ✗ Error: {error}")
+                elif added:
+                    total_added += added
+                    result_line = self.style.SUCCESS(f"  ✓ Added {added} clauses")
+                else:
+                    total = len(clauses_by_collection[contract_type_key])
+                    result_line = f"  ✓ All {total} clauses already stored"
+            self.stdout.write(f"\nProcessing {contract_type_key}...\n{result_line}")
 
         self.stdout.write(
             self.style.SUCCESS(f"\n✓ Successfully added {total_added} clauses to ChromaDB")
@@ -357,6 +356,23 @@ class Command(BaseCommand):
             self.style.SUCCESS(f"\n✓ Deleted {deleted_count} collections")
         )
 
+    def _handle_compact(self, chroma, contract_types):
+        """Handle --compact option"""
+        self.stdout.write(
+            self.style.HTTP_INFO(f"\n🧹 COMPACTING COLLECTIONS\n")
+        )
+
+        lines = []
+        for contract_type_key in contract_types:
+            try:
+                rewritten = chroma.compact_collection(contract_type_key)
+                lines.append(f"  ✓ {contract_type_key}: {rewritten} records")
+            except Exception as e:
+                lines.append(
+                    self.style.ERROR(f"  ✗ {contract_type_key}: {str(e)}")
+                )
+        self.stdout.write("\n".join(lines))
+
     def _confirm_action(self, prompt):
         """Ask user for confirmation"""
         while True:
@@ -1,7 +1,44 @@
+import hashlib
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
+def clause_text_hash(text):
+    """blake2b digest of a clause's text, used to spot duplicate clauses"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ContractQuerySet(models.QuerySet):
+
+    def list_view(self):
+        """Leave the extracted contract text in the database."""
+        return self.defer('extracted_text')
+
+    def with_relations(self, analyses=True, clauses=False):
+        """
+        Load each contract's user up front, plus its analyses (latest
+        first) and clauses when asked, so views don't run extra queries per
+        contract. Each prefetch costs one query, so only request the
+        relations that are read.
+        """
+        prefetches = []
+        if analyses:
+            prefetches.append(models.Prefetch(
+                'analysis',
+                queryset=ContractAnalysis.objects.list_view().order_by('-analysed_at'),
+            ))
+        if clauses:
+            prefetches.append(models.Prefetch(
+                'clauses',
+                queryset=Clause.objects.only(
+                    'id', 'contract_id', 'risk_level', 'similarity_score'
+                ),
+            ))
+        return self.select_related('user').prefetch_related(*prefetches)
+
+
 class Contract(models.Model):
     id = models.AutoField(primary_key=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="contracts")
@@ -11,11 +48,49 @@ class Contract(models.Model):
     jurisdiction = models.CharField(max_length=50)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Aggregates of the contract's clauses, written once when analysis
+    # completes so list views can filter and sort without reading JSON
+    high_risk_count = models.PositiveIntegerField(default=0, db_index=True)
+    avg_similarity = models.FloatField(default=0.0)
+
+    # Text of the PDF's first pages (as much as the prompts use), saved by
+    # the first analysis and reused when the contract is analyzed again
+    # instead of parsing the file a second time
+    extracted_text = models.TextField(blank=True, default='')
+
+    objects = ContractQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # A user's contracts, newest first
+            models.Index(fields=['user', '-uploaded_at']),
+        ]
+
     def __str__(self):
         return f"{self.id} ({self.user.username})"
 
 
+class ContractAnalysisQuerySet(models.QuerySet):
+
+    def list_view(self):
+        """
+        Load only the status columns, leaving the large JSON payloads
+        (summary, clauses, risks, suggestions) in the database.
+        """
+        return self.only(
+            'id', 'contract', 'extraction_status', 'analysed_at',
+            'processing_time', 'error_message',
+        )
+
+
 class ContractAnalysis(models.Model):
+
+    class ExtractionStatus(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
     id = models.AutoField(primary_key=True)
     contract = models.ForeignKey(
         Contract,
@@ -29,10 +104,24 @@ class ContractAnalysis(models.Model):
     suggestions = models.JSONField(null=True, blank=True)
     
     # Status fields
+    extraction_status = models.CharField(
+        max_length=20,
+        choices=ExtractionStatus.choices,
+        default=ExtractionStatus.PENDING,
+        db_index=True,
+    )
     error_message = models.TextField(blank=True, null=True)
     processing_time = models.FloatField(null=True, blank=True)
     analysed_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ContractAnalysisQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Latest analysis of a contract
+            models.Index(fields=['contract', '-analysed_at']),
+        ]
+
     def __str__(self):
         return f"Analysis for Contract {self.contract.id}"
 
@@ -52,10 +141,12 @@ class Clause(models.Model):
     )
     clause_type = models.CharField(max_length=100, blank=True)
     clause_text = models.TextField()  # longtext equivalent
+    text_hash = models.CharField(max_length=32, db_index=True, editable=False)
     risk_level = models.CharField(
         max_length=10,
         choices=RiskLevel.choices,
         default=RiskLevel.LOW,
+        db_index=True,
     )
     missing_parts = models.TextField(blank=True, null=True)
     suggestions = models.TextField(blank=True, null=True)
@@ -63,6 +154,23 @@ class Clause(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # A contract's clauses filtered by risk level
+            models.Index(fields=['contract', 'risk_level']),
+        ]
+        constraints = [
+            # The same clause text is stored once per contract
+            models.UniqueConstraint(
+                fields=['contract', 'text_hash'],
+                name='unique_clause_text_per_contract',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.text_hash = clause_text_hash(self.clause_text)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Clause {self.id} (Contract {self.contract.id})"
 
@@ -104,7 +212,7 @@ class Feedback(models.Model):
         on_delete=models.CASCADE,
         related_name="feedbacks"
     )
-    date = models.CharField(max_length=100)
+    date = models.DateTimeField(default=timezone.now)
     category = models.CharField(max_length=50, null=True, blank=True)
     rating = models.IntegerField()
     message = models.TextField(blank=True, null=True)
@@ -11,8 +11,12 @@ This package contains all the core service modules for contract analysis:
 """
 
 from .contract_processor import ContractProcessor
-from .chroma_manager import ChromaManager
-from .contract_analysis_service import ContractAnalysisService
+from .chroma_manager import ChromaManager, get_chroma_manager
+from .contract_analysis_service import (
+    ContractAnalysisService,
+    get_analysis_executor,
+    get_analysis_service,
+)
 from .contract_clause_mapping import (
     get_standard_clauses_for_type,
     get_critical_clauses_for_type,
@@ -23,7 +27,10 @@ from .contract_clause_mapping import (
 __all__ = [
     'ContractProcessor',
     'ChromaManager',
+    'get_chroma_manager',
     'ContractAnalysisService',
+    'get_analysis_executor',
+    'get_analysis_service',
     'get_standard_clauses_for_type',
     'get_critical_clauses_for_type',
     'is_clause_standard',
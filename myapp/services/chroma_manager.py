@@ -6,7 +6,12 @@ Uses ChromaDB for efficient semantic similarity search.
 """
 
 import os
+import hashlib
 import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings as django_settings
 
 logger = logging.getLogger(__name__)
@@ -14,11 +19,175 @@ logger = logging.getLogger(__name__)
 # Try to import chromadb, but gracefully handle if dependencies are missing
 try:
     import chromadb
+    from chromadb.config import Settings as ChromaSettings
+    from chromadb.errors import ChromaError
     CHROMADB_AVAILABLE = True
+    # Errors raised by ChromaDB itself or its SQLite store
+    CHROMA_ERRORS = (ChromaError, sqlite3.OperationalError)
 except ImportError as e:
     logger.warning(f"ChromaDB or its dependencies not available: {str(e)}")
     logger.warning("Clause similarity search will be disabled. Install with: pip install chromadb")
     CHROMADB_AVAILABLE = False
+    CHROMA_ERRORS = (sqlite3.OperationalError,)
+
+# NumPy is installed alongside chromadb; used to convert whole result
+# vectors at once
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Optional: with sentence-transformers installed, clause embeddings are
+# computed in one batched call (on a GPU when one is present) instead of
+# by ChromaDB's built-in CPU embedding function
+try:
+    import torch
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+# ChromaDB's default embedding function runs the same model through ONNX
+# Runtime with full graph optimization, which is faster than torch on a CPU;
+# used for batch encoding when there is no GPU
+try:
+    from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+    ONNX_EMBEDDINGS_AVAILABLE = True
+except ImportError:
+    ONNX_EMBEDDINGS_AVAILABLE = False
+
+# HNSW index parameters for new collections. Clause libraries are small and
+# recall matters more than build time, so the graph is denser than the
+# library defaults (M=16, construction_ef=100). These are fixed when a
+# collection is created; existing collections keep their parameters until
+# they are deleted and re-seeded.
+HNSW_M = 32
+HNSW_CONSTRUCTION_EF = 200
+HNSW_SEARCH_EF = 100
+HNSW_NUM_THREADS = os.cpu_count() or 1
+
+# Number of search results kept in memory; the same clause wording turns up
+# in many contracts, so repeated searches skip embedding and the HNSW query
+SEARCH_CACHE_SIZE = 4096
+
+# Boilerplate clauses are often reworded slightly (party names, numbering,
+# punctuation), which misses the exact-text cache above. A query whose
+# embedding has at least this cosine similarity to an already-searched one
+# in the same collection reuses that search's results. Kept high because
+# small wording changes ("shall" / "shall not") can still matter.
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+# Query texts shorter than this (after stripping) can't match a clause
+# meaningfully, so they get empty results without embedding or searching
+MIN_QUERY_LENGTH = 8
+
+# Upper bound on collections seeded concurrently by add_standard_clauses_multi()
+ADD_MAX_WORKERS = 8
+
+# Same model as ChromaDB's default embedding function, so embeddings computed
+# here are comparable with the ones ChromaDB computes for query texts
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+ENCODE_BATCH_SIZE = 128
+
+# Standard clause embeddings kept on disk (in the ChromaDB directory) by
+# content hash, so re-seeding collections doesn't re-run the model
+EMBEDDING_CACHE_FILE = 'std_embeddings.npz'
+
+
+def distance_to_similarity(distance) -> float:
+    """
+    Convert a ChromaDB distance into cosine similarity.
+    
+    Collections use the cosine space and clause embeddings are normalized,
+    so the distance ChromaDB returns is exactly 1 - cosine similarity.
+    
+    Args:
+        distance: Distance from a query result (None if unavailable)
+    
+    Returns:
+        float: Similarity clamped to 0-1 (0.0 if distance is None)
+    """
+    if distance is None:
+        return 0.0
+    return max(0.0, 1.0 - distance)
+
+
+def distances_to_similarities(distances) -> list:
+    """
+    Convert a list of ChromaDB distances into cosine similarities.
+    
+    Vectorized version of distance_to_similarity() for whole query results,
+    which matters once top_k grows into the hundreds.
+    
+    Args:
+        distances: Distances from a query result (None entries allowed)
+    
+    Returns:
+        list: Similarities clamped to 0-1, as Python floats
+    """
+    if not NUMPY_AVAILABLE:
+        return [distance_to_similarity(d) for d in distances]
+    # None becomes NaN here and then 0.0, matching distance_to_similarity
+    dists = np.asarray(distances, dtype=np.float64)
+    sims = np.clip(1.0 - dists, 0.0, None)
+    return np.nan_to_num(sims, nan=0.0).tolist()
+
+
+def text_preview(text, length: int) -> str:
+    """
+    Truncate a document for display, adding "..." only if it was cut.
+    
+    Used by the ChromaDB debug views and the test_chromadb command.
+    
+    Args:
+        text: Text to shorten (None gives "")
+        length (int): Maximum number of characters kept
+    
+    Returns:
+        str: The text, or its first length characters followed by "..."
+    """
+    if text is None:
+        return ""
+    return text if len(text) <= length else f"{text[:length]}..."
+
+
+def clause_id(clause_type: str, text: str) -> str:
+    """
+    Build a content-addressed ChromaDB ID for a clause.
+    
+    The same type and text always hash to the same ID, so re-adding an
+    unchanged clause can be detected and skipped.
+    
+    Args:
+        clause_type (str): Clause type, e.g. "Payment Terms"
+        text (str): Full clause text
+    
+    Returns:
+        str: 32-character hex digest
+    """
+    content = f"{clause_type}\n{text}".encode('utf-8')
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def is_clause_id(value: str) -> bool:
+    """
+    Check whether a stored ID was built by clause_id().
+    
+    Stores seeded before content-addressed IDs used positional IDs such as
+    "service_agreement_india_clause_3"; those never look like a digest.
+    """
+    return len(value) == 32 and all(c in '0123456789abcdef' for c in value)
+
+
+def _get_torch_device() -> str:
+    """Pick the fastest available torch device: CUDA, then Apple MPS, then CPU"""
+    if torch.cuda.is_available():
+        return 'cuda'
+    mps = getattr(torch.backends, 'mps', None)
+    if mps is not None and mps.is_available():
+        return 'mps'
+    return 'cpu'
 
 
 class ChromaManager:
@@ -44,6 +213,21 @@ class ChromaManager:
         """
         self.available = False
         self.client = None
+        self.persist_dir = None
+        self.encoder = None
+        self._encoder_lock = threading.Lock()
+        # Embedding cache: content hash -> embedding, loaded on first use
+        self._embedding_cache = None
+        self._embedding_cache_lock = threading.Lock()
+        # Collection handles by name, so repeated lookups skip the metadata store
+        self._collections = {}
+        self._collections_lock = threading.Lock()
+        # LRU of search results: (collection, query hash, top_k) -> result
+        self._search_cache = OrderedDict()
+        self._search_cache_lock = threading.Lock()
+        # Embeddings of searched queries with their results, by
+        # (collection, top_k); shares the search cache lock and size
+        self._semantic_cache = {}
         
         if not CHROMADB_AVAILABLE:
             logger.warning("ChromaDB not available - clause similarity search disabled")
@@ -65,8 +249,13 @@ class ChromaManager:
             os.makedirs(persist_dir, exist_ok=True)
             
             # Initialize ChromaDB client with persistent storage using new API
-            # Use PersistentClient for persistent storage (non-deprecated way)
-            self.client = chromadb.PersistentClient(path=persist_dir)
+            # Use PersistentClient for persistent storage (non-deprecated way);
+            # telemetry off so client startup doesn't make network calls
+            self.client = chromadb.PersistentClient(
+                path=persist_dir,
+                settings=ChromaSettings(anonymized_telemetry=False)
+            )
+            self.persist_dir = persist_dir
             self.available = True
             
             logger.info(f"ChromaDB initialized with storage at: {persist_dir}")
@@ -77,6 +266,289 @@ class ChromaManager:
             self.available = False
             self.client = None
 
+    def _get_encoder(self):
+        """
+        Lazily load the model used for batch encoding.
+        
+        With a GPU the sentence-transformers model runs there; on CPU-only
+        hosts the ONNX Runtime export bundled with ChromaDB is preferred,
+        falling back to sentence-transformers on the CPU.
+        
+        Returns:
+            SentenceTransformer model or ONNXMiniLM_L6_V2 function, or None if
+            neither is installed or the model could not be loaded (ChromaDB
+            then embeds documents itself)
+        """
+        if not (SENTENCE_TRANSFORMERS_AVAILABLE or ONNX_EMBEDDINGS_AVAILABLE):
+            return None
+        
+        if self.encoder is None:
+            with self._encoder_lock:
+                if self.encoder is None:
+                    try:
+                        device = _get_torch_device() if SENTENCE_TRANSFORMERS_AVAILABLE else 'cpu'
+                        if device == 'cpu' and ONNX_EMBEDDINGS_AVAILABLE:
+                            self.encoder = ONNXMiniLM_L6_V2(preferred_providers=['CPUExecutionProvider'])
+                            device = 'cpu (ONNX Runtime)'
+                        else:
+                            self.encoder = SentenceTransformer(EMBEDDING_MODEL_NAME, device=device)
+                        logger.info(f"Loaded embedding model '{EMBEDDING_MODEL_NAME}' on {device}")
+                    except Exception as e:
+                        logger.warning(f"Could not load embedding model, using ChromaDB default: {str(e)}")
+                        return None
+        return self.encoder
+
+    def _encode(self, texts: list):
+        """
+        Compute normalized embeddings for many texts in one batched call.
+        
+        Args:
+            texts (list): Texts to embed
+        
+        Returns:
+            list: One embedding (list of floats) per text, or None if no
+            encoder is available
+        """
+        encoder = self._get_encoder()
+        if encoder is None or not texts:
+            return None
+        
+        if ONNX_EMBEDDINGS_AVAILABLE and isinstance(encoder, ONNXMiniLM_L6_V2):
+            # The ONNX function downloads the model on first use and
+            # normalizes its output itself
+            try:
+                return [embedding.tolist() for embedding in encoder(texts)]
+            except Exception as e:
+                logger.warning(f"ONNX embedding failed, using ChromaDB default: {str(e)}")
+                return None
+        
+        embeddings = encoder.encode(
+            texts,
+            batch_size=ENCODE_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return embeddings.tolist()
+
+    def warm_up(self) -> bool:
+        """
+        Load the embedding model and every stored collection's index.
+        
+        Runs one forward pass, then one query against each non-empty
+        collection, so model loading (and the download on first use), the
+        slow first inference and loading each HNSW index from disk happen
+        before the first request that searches clauses. Collection handles
+        stay in the handle cache. get_chroma_manager() runs this in the
+        background when CHROMA_WARM_UP is set.
+        
+        Returns:
+            bool: True if the model is loaded and working
+        """
+        if not self.available:
+            return False
+        try:
+            embeddings = self._encode(["warm up"])
+        except Exception as e:
+            logger.warning(f"Embedding model warm-up failed: {str(e)}")
+            return False
+        ready = embeddings is not None
+        if ready:
+            logger.info("Embedding model warmed up")
+        
+        warmed = self._warm_up_collections(embeddings[0] if ready else None)
+        if warmed:
+            logger.info(f"Loaded {warmed} collection index(es)")
+        return ready
+
+    def _warm_up_collections(self, query_embedding=None) -> int:
+        """Query each stored, non-empty collection once so its index is loaded"""
+        try:
+            names = [collection.name for collection in self.client.list_collections()]
+        except CHROMA_ERRORS as e:
+            logger.warning(f"Could not list collections to warm up: {str(e)}")
+            return 0
+        
+        warmed = 0
+        for name in names:
+            collection = self.get_or_create_collection(name)
+            if collection is None:
+                continue
+            try:
+                if collection.count() == 0:
+                    continue
+                if query_embedding is not None:
+                    collection.query(query_embeddings=[query_embedding], n_results=1)
+                else:
+                    collection.query(query_texts=["warm up"], n_results=1)
+                warmed += 1
+            except CHROMA_ERRORS as e:
+                logger.warning(f"Could not warm up collection '{name}': {str(e)}")
+        return warmed
+
+    def _embedding_cache_path(self):
+        """Path of the on-disk embedding cache, or None without a persist dir"""
+        if self.persist_dir is None:
+            return None
+        return os.path.join(self.persist_dir, EMBEDDING_CACHE_FILE)
+
+    def _load_embedding_cache(self) -> dict:
+        """Load the on-disk embedding cache (call with _embedding_cache_lock held)"""
+        if self._embedding_cache is None:
+            self._embedding_cache = {}
+            cache_path = self._embedding_cache_path()
+            if cache_path and os.path.exists(cache_path):
+                try:
+                    with np.load(cache_path, allow_pickle=False) as data:
+                        self._embedding_cache = dict(
+                            zip(data['keys'].tolist(), data['vectors'].tolist())
+                        )
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable embedding cache: {str(e)}")
+        return self._embedding_cache
+
+    def _save_embedding_cache(self) -> None:
+        """Write the embedding cache to disk (call with _embedding_cache_lock held)"""
+        cache_path = self._embedding_cache_path()
+        if cache_path is None or not self._embedding_cache:
+            return
+        try:
+            tmp_path = f"{cache_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    keys=np.array(list(self._embedding_cache.keys())),
+                    vectors=np.array(list(self._embedding_cache.values()), dtype=np.float32)
+                )
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning(f"Could not write embedding cache: {str(e)}")
+
+    def _embed_and_cache(self, texts: list):
+        """
+        Get embeddings for texts, computing only those not cached on disk.
+        
+        Args:
+            texts (list): Texts to embed
+        
+        Returns:
+            list: One embedding per text, or None if some texts aren't
+            cached and no encoder is available (ChromaDB then embeds them)
+        """
+        if not NUMPY_AVAILABLE or not texts:
+            return self._encode(texts)
+        
+        keys = [
+            hashlib.blake2b(f"{EMBEDDING_MODEL_NAME}\n{text}".encode('utf-8'), digest_size=16).hexdigest()
+            for text in texts
+        ]
+        with self._embedding_cache_lock:
+            cache = self._load_embedding_cache()
+            missing = {key: text for key, text in zip(keys, texts) if key not in cache}
+        
+        if missing:
+            # Encode outside the lock so collections can embed concurrently
+            new_embeddings = self._encode(list(missing.values()))
+            if new_embeddings is None:
+                return None
+            with self._embedding_cache_lock:
+                cache.update(zip(missing.keys(), new_embeddings))
+                self._save_embedding_cache()
+            logger.debug(f"Embedded {len(missing)} of {len(texts)} clauses; rest from cache")
+        
+        return [cache[key] for key in keys]
+
+    def _search_cache_key(self, collection_name: str, query_text: str, top_k: int) -> tuple:
+        """
+        Key of a search in the result cache.
+        
+        The embedding model's tokenizer is uncased and splits on whitespace,
+        so texts differing only in case or spacing (e.g. re-extracted from a
+        PDF with different line breaks) embed identically and share a key.
+        """
+        normalized = " ".join(query_text.lower().split())
+        query_hash = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+        return (collection_name, query_hash, top_k)
+
+    def _search_cache_get(self, key: tuple):
+        """Return a copy of a cached search result, or None on a miss"""
+        with self._search_cache_lock:
+            result = self._search_cache.get(key)
+            if result is None:
+                return None
+            self._search_cache.move_to_end(key)
+        # Copy the lists so callers can't change the cached entry
+        return {field: list(values) for field, values in result.items()}
+
+    def _search_cache_put(self, key: tuple, result: dict) -> None:
+        """Cache a search result, evicting the least recently used entry if full"""
+        with self._search_cache_lock:
+            self._search_cache[key] = {field: list(values) for field, values in result.items()}
+            self._search_cache.move_to_end(key)
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+
+    def _semantic_cache_get(self, collection_name: str, top_k: int, embeddings: list) -> list:
+        """
+        Look up results of earlier searches with near-identical embeddings.
+        
+        All query embeddings are scored against every cached embedding for
+        the collection in one matrix product. Embeddings are normalized, so
+        the dot product is the cosine similarity.
+        
+        Args:
+            collection_name (str): Collection being searched
+            top_k (int): Number of results per query
+            embeddings (list): Normalized query embeddings
+        
+        Returns:
+            list: A copy of the cached result for each embedding scoring at
+            least SEMANTIC_CACHE_THRESHOLD, None for the others
+        """
+        hits = [None] * len(embeddings)
+        if not NUMPY_AVAILABLE:
+            return hits
+        
+        with self._search_cache_lock:
+            entry = self._semantic_cache.get((collection_name, top_k))
+            if entry is None or not entry['results']:
+                return hits
+            if entry['matrix'] is None:
+                entry['matrix'] = np.asarray(entry['vectors'], dtype=np.float32)
+            matrix, results = entry['matrix'], list(entry['results'])
+        
+        scores = np.asarray(embeddings, dtype=np.float32) @ matrix.T
+        best = scores.argmax(axis=1)
+        for i, j in enumerate(best.tolist()):
+            if scores[i, j] >= SEMANTIC_CACHE_THRESHOLD:
+                hits[i] = {field: list(values) for field, values in results[j].items()}
+        return hits
+
+    def _semantic_cache_put(self, collection_name: str, top_k: int, embeddings: list, results: list) -> None:
+        """Remember searched embeddings and their results, dropping the oldest if full"""
+        if not NUMPY_AVAILABLE or not embeddings:
+            return
+        with self._search_cache_lock:
+            entry = self._semantic_cache.setdefault(
+                (collection_name, top_k), {'vectors': [], 'results': [], 'matrix': None}
+            )
+            entry['vectors'].extend(embeddings)
+            entry['results'].extend(
+                {field: list(values) for field, values in result.items()}
+                for result in results
+            )
+            overflow = len(entry['results']) - SEARCH_CACHE_SIZE
+            if overflow > 0:
+                del entry['vectors'][:overflow]
+                del entry['results'][:overflow]
+            entry['matrix'] = None
+
+    def _clear_search_cache(self) -> None:
+        """Drop cached search results after a collection's contents change"""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+            self._semantic_cache.clear()
+
     def get_or_create_collection(self, collection_name: str):
         """
         Get existing collection or create new one if it doesn't exist.
@@ -84,6 +556,10 @@ class ChromaManager:
         Collections are used to organize clauses by contract type and jurisdiction.
         For example: "service_agreement_india", "employment_india", "nda_india"
         
+        Handles are cached per name, so only the first call for a collection
+        goes to ChromaDB. New collections use the cosine space and the
+        HNSW_* parameters above; those are frozen at creation.
+        
         Args:
             collection_name (str): Name of the collection
                 Example: "service_agreement_india"
@@ -101,11 +577,25 @@ class ChromaManager:
             logger.debug(f"ChromaDB not available - cannot create collection '{collection_name}'")
             return None
         
+        collection = self._collections.get(collection_name)
+        if collection is not None:
+            return collection
+        
         try:
-            collection = self.client.get_or_create_collection(
-                name=collection_name,
-                metadata={"hnsw:space": "cosine"}  # Use cosine similarity
-            )
+            with self._collections_lock:
+                collection = self._collections.get(collection_name)
+                if collection is None:
+                    collection = self.client.get_or_create_collection(
+                        name=collection_name,
+                        metadata={
+                            "hnsw:space": "cosine",  # Use cosine similarity
+                            "hnsw:M": HNSW_M,
+                            "hnsw:construction_ef": HNSW_CONSTRUCTION_EF,
+                            "hnsw:search_ef": HNSW_SEARCH_EF,
+                            "hnsw:num_threads": HNSW_NUM_THREADS,
+                        }
+                    )
+                    self._collections[collection_name] = collection
             logger.debug(f"Collection '{collection_name}' ready for use")
             return collection
             
@@ -113,7 +603,7 @@ class ChromaManager:
             logger.error(f"Error accessing collection '{collection_name}': {str(e)}")
             return None
 
-    def add_standard_clauses(self, collection_name: str, clauses: list) -> None:
+    def add_standard_clauses(self, collection_name: str, clauses: list) -> int:
         """
         Add standard clauses to a ChromaDB collection.
         
@@ -121,6 +611,11 @@ class ChromaManager:
         retrieval. The metadata helps identify the type and properties of
         the clause.
         
+        Clause IDs are derived from the clause type and text, so clauses
+        already in the collection are skipped rather than embedded again.
+        Records with positional IDs from before that scheme are deleted
+        first, so upgraded stores don't return every clause twice.
+        
         Args:
             collection_name (str): Name of the collection
                 Example: "service_agreement_india"
@@ -135,7 +630,7 @@ class ChromaManager:
                 }
         
         Returns:
-            None
+            int: Number of clauses newly added (0 if all were already stored)
         
         Example:
             >>> manager = ChromaManager()
@@ -149,42 +644,72 @@ class ChromaManager:
             ...     }
             ... ]
             >>> manager.add_standard_clauses("service_agreement_india", clauses)
+            1
         """
         if not self.available:
             logger.debug("ChromaDB not available - skipping clause storage")
-            return
+            return 0
         
         try:
             collection = self.get_or_create_collection(collection_name)
             if collection is None:
                 logger.warning(f"Could not get collection '{collection_name}'")
-                return
+                return 0
+            
+            # IDs already stored; fetched without documents or embeddings
+            seen_ids = set(collection.get(include=[])['ids'])
             
-            for i, clause in enumerate(clauses):
-                # Create unique ID for this clause
-                clause_id = f"{collection_name}_clause_{i}"
-                
-                # Extract text for vectorization
-                clause_text = clause.get('text', '')
-                
-                # Prepare metadata
-                metadata = {
+            # Drop records seeded under the old positional IDs; their
+            # clauses are re-added below under content-addressed IDs
+            legacy_ids = [cid for cid in seen_ids if not is_clause_id(cid)]
+            if legacy_ids:
+                batch_size = self._write_batch_size()
+                for start in range(0, len(legacy_ids), batch_size):
+                    collection.delete(ids=legacy_ids[start:start + batch_size])
+                seen_ids.difference_update(legacy_ids)
+                self._clear_search_cache()
+                logger.info(
+                    f"Removed {len(legacy_ids)} clauses with legacy IDs from '{collection_name}'"
+                )
+            
+            # Content-addressed IDs; keep the first copy of each clause not
+            # already stored (or repeated within this call)
+            new_clauses = {}
+            for clause in clauses:
+                cid = clause_id(clause.get('type', ''), clause.get('text', ''))
+                if cid not in seen_ids:
+                    new_clauses.setdefault(cid, clause)
+            
+            # Build the columns ChromaDB takes directly
+            ids = list(new_clauses)
+            documents = [clause.get('text', '') for clause in new_clauses.values()]
+            metadatas = [
+                {
                     'type': clause.get('type', ''),
                     'jurisdiction': clause.get('jurisdiction', ''),
                     'contract_type': clause.get('contract_type', ''),
                     'recommendations': clause.get('recommendations', ''),
                 }
-                
-                # Add to ChromaDB
-                collection.add(
-                    ids=[clause_id],
-                    documents=[clause_text],
-                    metadatas=[metadata]
-                )
+                for clause in new_clauses.values()
+            ]
+            
+            if not ids:
+                logger.info(f"All clauses already stored in '{collection_name}'")
+                return 0
+            
+            # Embed every clause up front in one batched call when possible,
+            # reusing embeddings cached from earlier runs
+            embeddings = self._embed_and_cache(documents)
+            
+            self._add_in_batches(collection, ids, documents, metadatas, embeddings)
+            
+            # Earlier search results may no longer be the closest matches
+            self._clear_search_cache()
             
             logger.info(
-                f"Successfully added {len(clauses)} clauses to '{collection_name}'"
+                f"Successfully added {len(ids)} clauses to '{collection_name}'"
             )
+            return len(ids)
             
         except Exception as e:
             logger.error(
@@ -192,17 +717,112 @@ class ChromaManager:
             )
             raise
 
+    def _write_batch_size(self) -> int:
+        """Records per add()/delete() call: CHROMA_BULK_BATCH_SIZE, capped by the client"""
+        return min(
+            django_settings.CHROMA_BULK_BATCH_SIZE,
+            self.client.get_max_batch_size()
+        )
+
+    def _add_in_batches(self, collection, ids, documents, metadatas, embeddings=None) -> None:
+        """
+        Add records to a collection in batches.
+        
+        Embeddings and SQLite writes are amortized over many clauses instead
+        of one call per clause, without exceeding the largest batch the
+        client accepts. Without embeddings, ChromaDB embeds the documents.
+        """
+        batch_size = self._write_batch_size()
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            batch = {
+                'ids': ids[start:end],
+                'documents': documents[start:end],
+                'metadatas': metadatas[start:end],
+            }
+            if embeddings is not None:
+                batch['embeddings'] = embeddings[start:end]
+            collection.add(**batch)
+
+    def add_standard_clauses_multi(self, clauses_by_collection: dict) -> dict:
+        """
+        Add standard clauses to several collections concurrently.
+        
+        Each collection is filled by add_standard_clauses() on its own
+        worker thread, so embedding one collection overlaps with SQLite
+        writes for another.
+        
+        Args:
+            clauses_by_collection (dict): Collection name -> list of clause
+                dicts, in the format add_standard_clauses() takes
+        
+        Returns:
+            dict: Collection name -> (number of clauses added, error message
+            or None), in the same order as the input
+        
+        Example:
+            >>> manager = get_chroma_manager()
+            >>> manager.add_standard_clauses_multi({
+            ...     "SERVICE_AGREEMENT_INDIA": service_clauses,
+            ...     "NDA_INDIA": nda_clauses,
+            ... })
+            {'SERVICE_AGREEMENT_INDIA': (25, None), 'NDA_INDIA': (18, None)}
+        """
+        if not clauses_by_collection:
+            return {}
+        
+        max_workers = min(ADD_MAX_WORKERS, len(clauses_by_collection))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                collection_name: executor.submit(self.add_standard_clauses, collection_name, clauses)
+                for collection_name, clauses in clauses_by_collection.items()
+            }
+        
+        results = {}
+        for collection_name, future in futures.items():
+            try:
+                results[collection_name] = (future.result(), None)
+            except Exception as e:
+                results[collection_name] = (0, str(e))
+        return results
+
+    def add_standard_clauses_background(self, clauses_by_collection: dict):
+        """
+        Queue add_standard_clauses_multi() on a background thread.
+        
+        Embedding and HNSW inserts can take seconds, so request handlers use
+        this to return immediately. All background loads share one worker
+        thread, so concurrent requests are written to ChromaDB one after
+        another instead of contending for it.
+        
+        Args:
+            clauses_by_collection (dict): Collection name -> list of clause
+                dicts, as for add_standard_clauses_multi()
+        
+        Returns:
+            concurrent.futures.Future resolving to the
+            add_standard_clauses_multi() result
+        """
+        future = _get_background_executor().submit(
+            self.add_standard_clauses_multi, clauses_by_collection
+        )
+        future.add_done_callback(_log_background_load)
+        return future
+
     def search_similar_clauses(
         self,
         collection_name: str,
         query_text: str,
-        top_k: int = 3
+        top_k: int = 3,
+        query_embedding=None
     ) -> dict:
         """
         Search for clauses similar to the given query text.
         
         Uses semantic similarity (cosine distance) to find standard clauses
         that are most similar to a clause found in the contract being analyzed.
+        A caller that already has the text's embedding can pass it so
+        ChromaDB doesn't embed the text again.
         
         Args:
             collection_name (str): Name of the collection to search
@@ -210,6 +830,8 @@ class ChromaManager:
             query_text (str): The clause text to search for similarities
                 Example: "Payment due within 15 days of invoice"
             top_k (int): Number of similar results to return (default: 3)
+            query_embedding: Optional precomputed embedding of query_text
+                from the same model (list of floats or 1-D numpy array)
         
         Returns:
             dict: Search results with format:
@@ -220,7 +842,13 @@ class ChromaManager:
                 "distances": [0.15, 0.25, ...]  # Lower = more similar
             }
             
-            If error occurs, returns empty results (doesn't raise exception)
+            If ChromaDB fails the query, or query_text is empty or shorter
+            than MIN_QUERY_LENGTH, returns empty results (doesn't raise
+            exception)
+        
+        Raises:
+            Exception: Errors that aren't ChromaDB errors (e.g. the embedding
+            model failing to load) propagate to the caller
         
         Example:
             >>> manager = ChromaManager()
@@ -242,55 +870,215 @@ class ChromaManager:
                 'distances': []
             }
         
+        if len((query_text or '').strip()) < MIN_QUERY_LENGTH:
+            logger.debug(f"Query text too short to search: {query_text!r}")
+            return {
+                'ids': [],
+                'documents': [],
+                'metadatas': [],
+                'distances': []
+            }
+        
+        cache_key = self._search_cache_key(collection_name, query_text, top_k)
+        cached = self._search_cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # get_or_create_collection() handles its own errors
+        collection = self.get_or_create_collection(collection_name)
+        if collection is None:
+            logger.warning(f"Could not get collection '{collection_name}'")
+            return {
+                'ids': [],
+                'documents': [],
+                'metadatas': [],
+                'distances': []
+            }
+        
+        # Perform similarity search
         try:
-            collection = self.get_or_create_collection(collection_name)
-            if collection is None:
-                logger.warning(f"Could not get collection '{collection_name}'")
-                return {
-                    'ids': [],
-                    'documents': [],
-                    'metadatas': [],
-                    'distances': []
-                }
-            
-            # Perform similarity search
-            results = collection.query(
-                query_texts=[query_text],
-                n_results=top_k
+            if query_embedding is not None:
+                results = collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=top_k
+                )
+            else:
+                results = collection.query(
+                    query_texts=[query_text],
+                    n_results=top_k
+                )
+        except CHROMA_ERRORS as e:
+            logger.warning(
+                f"Error searching clauses in '{collection_name}': {str(e)}"
             )
-            
+            # Return empty results instead of failing
+            return {
+                'ids': [],
+                'documents': [],
+                'metadatas': [],
+                'distances': []
+            }
+        
+        # Format results for easier consumption
+        if results and results['documents']:
             logger.debug(
                 f"Found {len(results['documents'][0])} similar clauses "
                 f"in '{collection_name}'"
             )
+            formatted = {
+                'ids': results['ids'][0],
+                'documents': results['documents'][0],
+                'metadatas': results['metadatas'][0],
+                'distances': results['distances'][0] if 'distances' in results else []
+            }
+        else:
+            formatted = {
+                'ids': [],
+                'documents': [],
+                'metadatas': [],
+                'distances': []
+            }
+        
+        self._search_cache_put(cache_key, formatted)
+        return formatted
+
+    def search_similar_clauses_bulk(
+        self,
+        collection_name: str,
+        query_texts: list,
+        top_k: int = 3
+    ) -> list:
+        """
+        Search for clauses similar to each of many query texts at once.
+        
+        All queries are embedded in one batch and sent to ChromaDB in a
+        single query() call, instead of one round trip per clause as with
+        search_similar_clauses(). Queries whose embedding is nearly
+        identical to an earlier query's (see SEMANTIC_CACHE_THRESHOLD)
+        reuse that query's results.
+        
+        Args:
+            collection_name (str): Name of the collection to search
+                Example: "service_agreement_india"
+            query_texts (list): Clause texts to search for similarities
+            top_k (int): Number of similar results per query (default: 3)
+        
+        Returns:
+            list: One result dict per query text, in the same order and
+            with the same format as search_similar_clauses() returns.
             
-            # Format results for easier consumption
-            if results and results['documents']:
-                return {
-                    'ids': results['ids'][0],
-                    'documents': results['documents'][0],
-                    'metadatas': results['metadatas'][0],
-                    'distances': results['distances'][0] if 'distances' in results else []
-                }
+            If ChromaDB fails the query, every entry is an empty result
+            (doesn't raise exception). Texts shorter than MIN_QUERY_LENGTH
+            always get an empty result.
+        
+        Raises:
+            Exception: Errors that aren't ChromaDB errors (e.g. the embedding
+            model failing to load) propagate to the caller
+        
+        Example:
+            >>> manager = get_chroma_manager()
+            >>> results = manager.search_similar_clauses_bulk(
+            ...     "service_agreement_india",
+            ...     ["Payment due in 15 days", "Either party may terminate"],
+            ...     top_k=3
+            ... )
+            >>> len(results)
+            2
+        """
+        empty_results = [
+            {
+                'ids': [],
+                'documents': [],
+                'metadatas': [],
+                'distances': []
+            }
+            for _ in query_texts
+        ]
+        
+        if not self.available or not query_texts:
+            return empty_results
+        
+        # Answer too-short and repeated queries without ChromaDB; only the
+        # rest are embedded and searched
+        cache_keys = [
+            self._search_cache_key(collection_name, query_text, top_k)
+            if len((query_text or '').strip()) >= MIN_QUERY_LENGTH else None
+            for query_text in query_texts
+        ]
+        search_results = [
+            self._search_cache_get(key) if key is not None else empty
+            for key, empty in zip(cache_keys, empty_results)
+        ]
+        missing = [i for i, result in enumerate(search_results) if result is None]
+        if not missing:
+            return search_results
+        missing_texts = [query_texts[i] for i in missing]
+        
+        # get_or_create_collection() handles its own errors
+        collection = self.get_or_create_collection(collection_name)
+        if collection is None:
+            logger.warning(f"Could not get collection '{collection_name}'")
+            return empty_results
+        
+        # Embed with the same model used when adding clauses, if loaded;
+        # otherwise ChromaDB embeds the query texts itself
+        query_embeddings = self._encode(missing_texts)
+        
+        # Reworded repeats of earlier queries reuse their results
+        if query_embeddings is not None:
+            similar = self._semantic_cache_get(collection_name, top_k, query_embeddings)
+            still_missing = []
+            for i, embedding, result in zip(missing, query_embeddings, similar):
+                if result is None:
+                    still_missing.append((i, embedding))
+                    continue
+                search_results[i] = result
+                self._search_cache_put(cache_keys[i], result)
+            if not still_missing:
+                return search_results
+            missing = [i for i, _ in still_missing]
+            missing_texts = [query_texts[i] for i in missing]
+            query_embeddings = [embedding for _, embedding in still_missing]
+        
+        try:
+            if query_embeddings is not None:
+                results = collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=top_k
+                )
             else:
-                return {
-                    'ids': [],
-                    'documents': [],
-                    'metadatas': [],
-                    'distances': []
-                }
-            
-        except Exception as e:
+                results = collection.query(
+                    query_texts=missing_texts,
+                    n_results=top_k
+                )
+        except CHROMA_ERRORS as e:
             logger.warning(
                 f"Error searching clauses in '{collection_name}': {str(e)}"
             )
             # Return empty results instead of failing
-            return {
-                'ids': [],
-                'documents': [],
-                'metadatas': [],
-                'distances': []
+            return empty_results
+        
+        distances = results.get('distances') or [[] for _ in missing_texts]
+        for i, ids, documents, metadatas, query_distances in zip(
+            missing,
+            results['ids'],
+            results['documents'],
+            results['metadatas'],
+            distances
+        ):
+            search_results[i] = {
+                'ids': ids,
+                'documents': documents,
+                'metadatas': metadatas,
+                'distances': query_distances
             }
+            self._search_cache_put(cache_keys[i], search_results[i])
+        if query_embeddings is not None:
+            self._semantic_cache_put(
+                collection_name, top_k, query_embeddings,
+                [search_results[i] for i in missing]
+            )
+        return search_results
 
     def delete_collection(self, collection_name: str) -> None:
         """
@@ -312,8 +1100,130 @@ class ChromaManager:
             logger.debug("ChromaDB not available - cannot delete collection")
             return
         
+        # Drop the cached handle even if the delete fails, so the next
+        # lookup goes back to ChromaDB
+        with self._collections_lock:
+            self._collections.pop(collection_name, None)
+        self._clear_search_cache()
+        
         try:
             self.client.delete_collection(name=collection_name)
             logger.info(f"Deleted collection: {collection_name}")
         except Exception as e:
             logger.warning(f"Error deleting collection '{collection_name}': {str(e)}")
+
+    def compact_collection(self, collection_name: str) -> int:
+        """
+        Rebuild a collection from its stored records.
+        
+        The HNSW index only grows as clauses are added and deleted, so a
+        long-lived collection gradually takes more memory and disk and gets
+        slower to query. This reads every record with its embedding, drops
+        the collection and writes the records back into a fresh one, which
+        also picks up the current HNSW_* parameters. Nothing is re-embedded.
+        
+        Args:
+            collection_name (str): Name of the collection to rebuild
+        
+        Returns:
+            int: Number of records rewritten (0 if the collection is missing
+            or empty)
+        
+        Example:
+            >>> manager = get_chroma_manager()
+            >>> manager.compact_collection("SERVICE_AGREEMENT_INDIA")
+            25
+        """
+        if not self.available or self.client is None:
+            logger.debug("ChromaDB not available - cannot compact collection")
+            return 0
+        
+        try:
+            collection = self.client.get_collection(name=collection_name)
+        except CHROMA_ERRORS:
+            logger.warning(f"Collection '{collection_name}' does not exist - nothing to compact")
+            return 0
+        
+        records = collection.get(include=['documents', 'metadatas', 'embeddings'])
+        ids = records['ids']
+        if not ids:
+            return 0
+        
+        self.delete_collection(collection_name)
+        try:
+            collection = self.get_or_create_collection(collection_name)
+            self._add_in_batches(
+                collection, ids, records['documents'], records['metadatas'], records['embeddings']
+            )
+        except Exception as e:
+            logger.error(
+                f"Error rebuilding '{collection_name}' after dropping it; "
+                f"re-run test_chromadb --init-clauses to restore it: {str(e)}"
+            )
+            raise
+        
+        logger.info(f"Compacted '{collection_name}' ({len(ids)} records)")
+        return len(ids)
+
+
+# ============================================================================
+# HELPER FUNCTIONS
+# ============================================================================
+# Global instance for convenient access
+_chroma_manager = None
+_chroma_manager_lock = threading.Lock()
+
+# Single worker thread for add_standard_clauses_background()
+_background_executor = None
+_background_executor_lock = threading.Lock()
+
+
+def get_chroma_manager() -> ChromaManager:
+    """
+    Get the shared ChromaManager instance.
+    
+    Opening the persistent client is expensive, so callers that run per
+    request (views, management commands) should reuse one instance instead
+    of constructing ChromaManager() each time. If a previous initialization
+    failed, a new instance is created on the next call.
+    
+    With the CHROMA_WARM_UP setting on, a new instance loads its embedding
+    model on the background worker thread (see ChromaManager.warm_up()).
+    
+    Returns:
+        ChromaManager shared instance
+    """
+    global _chroma_manager
+    if _chroma_manager is None or not _chroma_manager.available:
+        with _chroma_manager_lock:
+            if _chroma_manager is None or not _chroma_manager.available:
+                _chroma_manager = ChromaManager()
+                if _chroma_manager.available and getattr(django_settings, 'CHROMA_WARM_UP', False):
+                    _get_background_executor().submit(_chroma_manager.warm_up)
+    return _chroma_manager
+
+
+def _get_background_executor() -> ThreadPoolExecutor:
+    """Get the shared single-thread executor for background clause loads"""
+    global _background_executor
+    if _background_executor is None:
+        with _background_executor_lock:
+            if _background_executor is None:
+                _background_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='chroma-load'
+                )
+    return _background_executor
+
+
+def _log_background_load(future) -> None:
+    """Log the outcome of a background clause load"""
+    try:
+        results = future.result()
+    except Exception as e:
+        logger.error(f"Background clause load failed: {str(e)}")
+        return
+    total_added = sum(added for added, _ in results.values())
+    for collection_name, (_, error) in results.items():
+        if error:
+            logger.error(f"Background load of '{collection_name}' failed: {error}")
+    logger.info(f"Background clause load added {total_added} clauses to {len(results)} collections")
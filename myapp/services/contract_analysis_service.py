@@ -13,32 +13,42 @@ Author: ClauseGuard Development Team
 Date: January 17, 2026
 """
 
+import hashlib
 import json
 import logging
 import time
 import os
 import re
-from threading import Thread
-from datetime import datetime
+import threading
+from threading import Lock, Thread
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 from io import BytesIO
 
 # Django imports
 from django.conf import settings
-from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
 
 # LangChain imports for Groq LLM
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.exceptions import LangChainException
+from groq import GroqError
+from pydantic import ValidationError
 
 # Application imports
-from myapp.models import Contract, ContractAnalysis
+from myapp.models import Clause, Contract, ContractAnalysis, clause_text_hash
 from myapp.services.contract_processor import ContractProcessor
-from myapp.services.chroma_manager import ChromaManager
-from myapp.services.contract_clause_mapping import ContractClauseMapper
+from myapp.services.chroma_manager import (
+    ChromaManager,
+    get_chroma_manager,
+    distance_to_similarity,
+)
+from myapp.services.contract_clause_mapping import get_mapper
 from myapp.services.prompts import (
     SUMMARY_PROMPT,
     CLAUSE_EXTRACTION_PROMPT,
@@ -54,6 +64,39 @@ from myapp.services.schemas import (
 
 logger = logging.getLogger(__name__)
 
+# Characters of contract text sent to the LLM in each prompt
+LLM_CONTEXT_CHARS = 5000
+
+# Layout whitespace in extracted PDF text (table padding, blank lines)
+_HORIZONTAL_SPACE_RE = re.compile(r'[ \t\r\f\v]+')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+
+# Markdown code fences LLMs wrap around JSON replies
+_OPENING_FENCE_RE = re.compile(r'^```(?:json)?\s*')
+_CLOSING_FENCE_RE = re.compile(r'\s*```$')
+
+# LLM calls running in the background while analyze_contract() works on the
+# next step (summary, risks and suggestions)
+LLM_MAX_WORKERS = 3
+
+# Failures an LLM step recovers from with safe defaults: API/network errors
+# and replies that aren't JSON or don't match the schema (ValidationError
+# from model_validate_json covers both). Anything else is a bug and fails
+# the analysis.
+LLM_STEP_ERRORS = (LangChainException, GroqError, ValidationError)
+
+# Hash of each chain's prompt template, part of the LLM response cache key
+# so replies to an edited prompt aren't served from the cache
+_PROMPT_HASHES = {
+    name: hashlib.blake2b(template.encode('utf-8'), digest_size=16).hexdigest()
+    for name, template in (
+        ('summary', SUMMARY_PROMPT),
+        ('clauses', CLAUSE_EXTRACTION_PROMPT),
+        ('risks', RISK_ANALYSIS_PROMPT),
+        ('suggestions', SUGGESTIONS_PROMPT),
+    )
+}
+
 
 # ============================================================================
 # UTILITY FUNCTIONS
@@ -72,14 +115,44 @@ def clean_json_output(text: str) -> str:
     Returns:
         Clean JSON string ready for parsing
     """
-    # Remove markdown code fences (```json ... ``` or just ``` ... ```)
-    text = re.sub(r'^```(?:json)?\s*', '', text.strip())
-    text = re.sub(r'\s*```$', '', text.strip())
+    text = text.strip()
+    
+    # Remove markdown code fences (```json ... ``` or just ``` ... ```); most
+    # replies follow the prompt and have none, so skip the regexes then
+    if text.startswith('```'):
+        text = _OPENING_FENCE_RE.sub('', text)
+    if text.endswith('```'):
+        text = _CLOSING_FENCE_RE.sub('', text)
     
     # Remove any leading/trailing whitespace
-    text = text.strip()
+    return text.strip()
+
+
+def llm_excerpt(text: str, limit: int = LLM_CONTEXT_CHARS) -> str:
+    """
+    Cut extracted contract text down to the part sent to the LLM.
     
-    return text
+    Runs of spaces and blank lines left by PDF layout are collapsed first,
+    so the character budget goes to contract wording, and the cut falls on
+    the last whitespace before the limit instead of mid-word.
+    
+    Args:
+        text: Text extracted from the PDF
+        limit: Maximum length of the excerpt
+    
+    Returns:
+        Excerpt of at most limit characters
+    """
+    text = _HORIZONTAL_SPACE_RE.sub(' ', text)
+    text = _BLANK_LINES_RE.sub('\n\n', text).strip()
+    if len(text) <= limit:
+        return text
+    
+    # Only back up to a word boundary if one is reasonably close
+    cut = max(text.rfind(' ', 0, limit + 1), text.rfind('\n', 0, limit + 1))
+    if cut < limit // 2:
+        cut = limit
+    return text[:cut].rstrip()
 
 
 class ContractAnalysisService:
@@ -114,9 +187,11 @@ class ContractAnalysisService:
         self.processor = ContractProcessor()
         logger.info("  ✓ ContractProcessor initialized")
         
+        # Shared per process: the persistent client and its cached collection
+        # handles survive across requests instead of being reopened each time
         logger.info("  - Initializing ChromaManager...")
         try:
-            self.chroma_manager = ChromaManager()
+            self.chroma_manager = get_chroma_manager()
             if self.chroma_manager.available:
                 logger.info("  ✓ ChromaManager initialized")
             else:
@@ -128,7 +203,7 @@ class ContractAnalysisService:
             self.chroma_manager = ChromaManager()
         
         logger.info("  - Initializing ContractClauseMapper...")
-        self.clause_mapper = ContractClauseMapper()
+        self.clause_mapper = get_mapper()
         logger.info("  ✓ ContractClauseMapper initialized")
         
         # Initialize Groq LLM via LangChain
@@ -139,7 +214,7 @@ class ContractAnalysisService:
             logger.error("  Solution: Add GROQ_API_KEY to .env or system environment")
             raise ValueError("GROQ_API_KEY not found in environment variables")
         
-        logger.info(f"  ✓ GROQ_API_KEY found (starts with: {self.groq_api_key[:10]}...)")
+        logger.info("  ✓ GROQ_API_KEY found (starts with: %s...)", self.groq_api_key[:10])
         
         logger.info("  - Initializing ChatGroq with Llama 3.1 70B...")
         try:
@@ -156,10 +231,69 @@ class ContractAnalysisService:
             logger.error("  Check: Is GROQ_API_KEY valid?")
             raise
         
+        # Prompts are constants, so each step's chain is built once here
+        # instead of on every call. No JsonOutputParser - output is cleaned
+        # and parsed manually
+        self._summary_chain = PromptTemplate.from_template(SUMMARY_PROMPT) | self.llm
+        self._clauses_chain = PromptTemplate.from_template(CLAUSE_EXTRACTION_PROMPT) | self.llm
+        self._risks_chain = PromptTemplate.from_template(RISK_ANALYSIS_PROMPT) | self.llm
+        self._suggestions_chain = PromptTemplate.from_template(SUGGESTIONS_PROMPT) | self.llm
+        
         logger.info("="*80)
         logger.info("✓ ContractAnalysisService initialized successfully")
         logger.info("="*80)
     
+    def _llm_cache_key(self, chain_name: str, inputs: Dict[str, Any]) -> str:
+        """Cache key of a response: hash of the chain name, its prompt, the model and inputs"""
+        key_data = json.dumps(
+            [chain_name, _PROMPT_HASHES[chain_name], self.llm.model_name, inputs],
+            sort_keys=True
+        )
+        return "llm:" + hashlib.blake2b(key_data.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _invoke_llm(self, chain, chain_name: str, inputs: Dict[str, Any]) -> str:
+        """
+        Run one of the prompt chains and return the raw response text.
+        
+        A response cached by _cache_llm_response() for the same chain, prompt
+        template, model and inputs is returned without calling Groq, so analyzing the same
+        contract again - a duplicate upload, a double click or a retry -
+        skips the round trip. Responses aren't cached here; the step caches
+        one only after it validates, so a malformed reply isn't replayed.
+        
+        Args:
+            chain: Prompt chain to invoke
+            chain_name: Name of the chain, part of the cache key
+            inputs: Prompt variables
+        
+        Returns:
+            Text content of the LLM response
+        """
+        raw_text = cache.get(self._llm_cache_key(chain_name, inputs))
+        if raw_text is not None:
+            logger.debug("Using cached %s response", chain_name)
+            return raw_text
+        
+        llm_output = chain.invoke(inputs)
+        
+        # Extract text content from LLM output
+        if hasattr(llm_output, 'content'):
+            return llm_output.content
+        return str(llm_output)
+    
+    def _cache_llm_response(self, chain_name: str, inputs: Dict[str, Any], raw_text: str) -> None:
+        """
+        Cache a response that passed schema validation.
+        
+        Kept for LLM_CACHE_TIMEOUT seconds; an entry that is already cached
+        isn't rewritten.
+        """
+        cache.add(
+            self._llm_cache_key(chain_name, inputs),
+            raw_text,
+            timeout=getattr(settings, 'LLM_CACHE_TIMEOUT', 86400)
+        )
+    
     # ============================================================================
     # MAIN ORCHESTRATOR METHOD
     # ============================================================================
@@ -170,7 +304,8 @@ class ContractAnalysisService:
         contract_analysis_id: int,
         contract_type: str,
         jurisdiction: str,
-        llm_model: str
+        llm_model: str,
+        contract_data: Optional[bytes] = None
     ) -> Dict[str, Any]:
         """
         Main entry point for contract analysis.
@@ -191,6 +326,8 @@ class ContractAnalysisService:
             contract_type: Type like "SERVICE_AGREEMENT_INDIA"
             jurisdiction: Location like "INDIA"
             llm_model: LLM model to use (not currently used, fixed to mixtral)
+            contract_data: PDF contents, if the caller still has the upload
+                in memory; otherwise the saved file is read from disk
         
         Returns:
             Dict with:
@@ -213,133 +350,163 @@ class ContractAnalysisService:
         try:
             logger.info("="*80)
             logger.info("ANALYZE_CONTRACT() CALLED")
-            logger.info(f"  Contract ID: {contract_id}")
-            logger.info(f"  Analysis ID: {contract_analysis_id}")
-            logger.info(f"  Contract Type: {contract_type}")
-            logger.info(f"  Jurisdiction: {jurisdiction}")
-            logger.info(f"  LLM Model: {llm_model}")
+            logger.info("  Contract ID: %s", contract_id)
+            logger.info("  Analysis ID: %s", contract_analysis_id)
+            logger.info("  Contract Type: %s", contract_type)
+            logger.info("  Jurisdiction: %s", jurisdiction)
+            logger.info("  LLM Model: %s", llm_model)
             logger.info("="*80)
             
             # ==================== STEP 1: FETCH EXISTING RECORDS ====================
             logger.info("[STEP 1/7] Fetching contract and analysis records...")
             try:
-                contract = Contract.objects.get(id=contract_id)
+                contract = Contract.objects.with_relations(analyses=False).get(id=contract_id)
                 contract_analysis = ContractAnalysis.objects.get(id=contract_analysis_id)
-                logger.info(f"  ✓ Contract loaded (ID: {contract.id})")
-                logger.info(f"  ✓ ContractAnalysis loaded (ID: {contract_analysis.id})")
+                logger.info("  ✓ Contract loaded (ID: %s)", contract.id)
+                logger.info("  ✓ ContractAnalysis loaded (ID: %s)", contract_analysis.id)
             except Contract.DoesNotExist:
                 raise ValueError(f"Contract with ID {contract_id} not found")
             except ContractAnalysis.DoesNotExist:
                 raise ValueError(f"ContractAnalysis with ID {contract_analysis_id} not found")
             
+            # Queued analyses stay pending until a worker gets here
+            contract_analysis.extraction_status = ContractAnalysis.ExtractionStatus.PROCESSING
+            contract_analysis.save(update_fields=['extraction_status'])
+            
             # ==================== STEP 2: EXTRACT TEXT ====================
             logger.info("[STEP 2/7] Extracting text from PDF...")
             try:
-                # Use the contract file path from the already-saved file
+                # Prefer the uploaded bytes; the saved file's path is only
+                # read when they aren't available
                 contract_text = self._extract_contract_text(
-                    contract_file=None,  # Not needed, we have the path
-                    contract_path=contract.contract_file.path
+                    contract_file=contract_data,
+                    contract_path=contract.contract_file.path,
+                    contract=contract
                 )
-                logger.info(f"  ✓ Successfully extracted {len(contract_text)} characters from PDF")
+                logger.info("  ✓ Successfully extracted %s characters from PDF", len(contract_text))
             except Exception as e:
                 logger.error(f"  ✗ PDF extraction failed: {str(e)}", exc_info=True)
                 raise
             
-            # ==================== STEP 3: SUMMARY ANALYSIS ====================
-            logger.info("[STEP 3/7] Analyzing contract summary (calling Groq LLM)...")
-            try:
-                summary_data = self._analyze_summary(
+            # Every prompt sees only the start of the contract, so cut it
+            # once here; slicing it again in the step methods is free
+            contract_text = llm_excerpt(contract_text)
+            
+            # Independent LLM calls overlap on worker threads: the summary and
+            # risk analysis (whose prompts only need the contract text) run
+            # alongside clause extraction, and suggestions (which only need
+            # the missing clauses) alongside the ChromaDB search
+            with ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS) as executor:
+                # ==================== STEP 3: SUMMARY ANALYSIS ====================
+                logger.info("[STEP 3/7] Analyzing contract summary (calling Groq LLM in background)...")
+                summary_future = executor.submit(
+                    self._analyze_summary,
                     contract_text=contract_text,
                     contract_type=contract_type
                 )
-                logger.info(f"  ✓ Summary analysis completed")
-                logger.info(f"    - Contract Type: {summary_data.get('contract_type', 'N/A')}")
-                logger.info(f"    - Parties: {len(summary_data.get('parties', []))} parties identified")
-            except Exception as e:
-                logger.error(f"  ✗ Summary analysis failed (Groq issue?): {str(e)}", exc_info=True)
-                raise
-            
-            # ==================== STEP 4: CLAUSE EXTRACTION ====================
-            logger.info("[STEP 4/7] Extracting clauses from contract (calling Groq LLM)...")
-            try:
-                clauses_data = self._extract_clauses(
-                    contract_text=contract_text
-                )
-                logger.info(f"  ✓ Extracted {len(clauses_data.get('clauses', []))} clauses")
-            except Exception as e:
-                logger.error(f"  ✗ Clause extraction failed (Groq issue?): {str(e)}", exc_info=True)
-                raise
-            
-            # ==================== STEP 5: CHROMA SEARCH ====================
-            logger.info("[STEP 5/7] Searching ChromaDB for similar standard clauses...")
-            try:
-                chromadb_comparisons = self._search_similar_clauses(
-                    found_clauses=clauses_data.get('clauses', []),
-                    contract_type=contract_type
-                )
-                logger.info(f"  ✓ ChromaDB search completed")
-            except Exception as e:
-                logger.error(f"  ✗ ChromaDB search failed: {str(e)}", exc_info=True)
-                raise
-            
-            # ==================== STEP 6: RISK ANALYSIS ====================
-            logger.info("[STEP 6/7] Analyzing risks in contract (calling Groq LLM)...")
-            try:
-                risks_data = self._analyze_risks(
+                
+                # ==================== STEP 6: RISK ANALYSIS ====================
+                logger.info("[STEP 6/7] Analyzing risks in contract (calling Groq LLM in background)...")
+                risks_future = executor.submit(
+                    self._analyze_risks,
                     contract_text=contract_text,
                     contract_type=contract_type,
-                    clauses=clauses_data.get('clauses', []),
-                    chromadb_comparisons=chromadb_comparisons,
                     jurisdiction=jurisdiction
                 )
-                logger.info(f"  ✓ Identified {len(risks_data.get('risks', []))} risks")
-            except Exception as e:
-                logger.error(f"  ✗ Risk analysis failed (Groq issue?): {str(e)}", exc_info=True)
-                raise
-            
-            # ==================== STEP 7: GENERATE SUGGESTIONS ====================
-            logger.info("[STEP 7/7] Generating improvement suggestions (calling Groq LLM)...")
-            try:
+                
+                # ==================== STEP 4: CLAUSE EXTRACTION ====================
+                logger.info("[STEP 4/7] Extracting clauses from contract (calling Groq LLM)...")
+                try:
+                    clauses_data = self._extract_clauses(
+                        contract_text=contract_text
+                    )
+                    logger.info("  ✓ Extracted %s clauses", len(clauses_data.get('clauses', [])))
+                except Exception as e:
+                    logger.error(f"  ✗ Clause extraction failed (Groq issue?): {str(e)}", exc_info=True)
+                    raise
+                
+                # ==================== STEP 7: GENERATE SUGGESTIONS ====================
+                logger.info("[STEP 7/7] Generating improvement suggestions (calling Groq LLM in background)...")
                 missing_clauses = self._find_missing_clauses(
                     found_clauses=clauses_data.get('clauses', []),
                     contract_type=contract_type
                 )
-                logger.info(f"  - Found {len(missing_clauses)} missing clauses")
-                
-                suggestions_data = self._generate_suggestions(
+                logger.info("  - Found %s missing clauses", len(missing_clauses))
+                suggestions_future = executor.submit(
+                    self._generate_suggestions,
                     contract_text=contract_text,
                     contract_type=contract_type,
                     missing_clauses=missing_clauses,
                     jurisdiction=jurisdiction
                 )
-                logger.info(f"  ✓ Generated {len(suggestions_data.get('suggestions', []))} suggestions")
-            except Exception as e:
-                logger.error(f"  ✗ Suggestion generation failed (Groq issue?): {str(e)}", exc_info=True)
-                raise
+                
+                # ==================== STEP 5: CHROMA SEARCH ====================
+                logger.info("[STEP 5/7] Searching ChromaDB for similar standard clauses...")
+                try:
+                    chromadb_comparisons = self._search_similar_clauses(
+                        found_clauses=clauses_data.get('clauses', []),
+                        contract_type=contract_type
+                    )
+                    logger.info("  ✓ ChromaDB search completed")
+                except Exception as e:
+                    logger.error(f"  ✗ ChromaDB search failed: {str(e)}", exc_info=True)
+                    raise
+                
+                # Collect the background calls
+                try:
+                    risks_data = risks_future.result()
+                    logger.info("  ✓ Identified %s risks", len(risks_data.get('risks', [])))
+                except Exception as e:
+                    logger.error(f"  ✗ Risk analysis failed (Groq issue?): {str(e)}", exc_info=True)
+                    raise
+                
+                try:
+                    summary_data = summary_future.result()
+                    logger.info("  ✓ Summary analysis completed")
+                    logger.info("    - Contract Type: %s", summary_data.get('contract_type', 'N/A'))
+                    logger.info("    - Parties: %s parties identified", len(summary_data.get('parties', [])))
+                except Exception as e:
+                    logger.error(f"  ✗ Summary analysis failed (Groq issue?): {str(e)}", exc_info=True)
+                    raise
+                
+                try:
+                    suggestions_data = suggestions_future.result()
+                    logger.info("  ✓ Generated %s suggestions", len(suggestions_data.get('suggestions', [])))
+                except Exception as e:
+                    logger.error(f"  ✗ Suggestion generation failed (Groq issue?): {str(e)}", exc_info=True)
+                    raise
             
             # ==================== STEP 8: SAVE RESULTS ====================
             logger.info("[STEP 8/8] Saving analysis results to database...")
             processing_time = time.time() - start_time
             
-            contract_analysis = self._save_analysis_results(
-                contract_analysis=contract_analysis,
-                summary=summary_data,
-                clauses=clauses_data,
-                risks=risks_data,
-                suggestions=suggestions_data,
-                processing_time=processing_time
-            )
-            logger.info(f"Analysis saved successfully in {processing_time:.2f} seconds")
+            with transaction.atomic():
+                contract_analysis = self._save_analysis_results(
+                    contract_analysis=contract_analysis,
+                    summary=summary_data,
+                    clauses=clauses_data,
+                    risks=risks_data,
+                    suggestions=suggestions_data,
+                    processing_time=processing_time
+                )
+                clause_records = self._save_clause_records(
+                    contract=contract,
+                    clauses=clauses_data.get('clauses', []),
+                    risks=risks_data.get('risks', []),
+                    chromadb_comparisons=chromadb_comparisons
+                )
+                self._update_contract_stats(contract, clause_records)
+            logger.info("Analysis saved successfully in %.2f seconds", processing_time)
             
             # ==================== RETURN RESULTS ====================
             logger.info("="*80)
-            logger.info(f"✓ ANALYSIS COMPLETED SUCCESSFULLY")
-            logger.info(f"  - Analysis ID: {contract_analysis.id}")
-            logger.info(f"  - Processing time: {processing_time:.2f}s")
-            logger.info(f"  - Summary generated: {bool(summary_data)}")
-            logger.info(f"  - Clauses found: {len(clauses_data.get('clauses', []))}")
-            logger.info(f"  - Risks identified: {len(risks_data.get('risks', []))}")
-            logger.info(f"  - Suggestions generated: {len(suggestions_data.get('suggestions', []))}")
+            logger.info("✓ ANALYSIS COMPLETED SUCCESSFULLY")
+            logger.info("  - Analysis ID: %s", contract_analysis.id)
+            logger.info("  - Processing time: %.2fs", processing_time)
+            logger.info("  - Summary generated: %s", bool(summary_data))
+            logger.info("  - Clauses found: %s", len(clauses_data.get('clauses', [])))
+            logger.info("  - Risks identified: %s", len(risks_data.get('risks', [])))
+            logger.info("  - Suggestions generated: %s", len(suggestions_data.get('suggestions', [])))
             logger.info("="*80)
             
             return {
@@ -364,63 +531,19 @@ class ContractAnalysisService:
             # Mark analysis as failed
             try:
                 if 'contract_analysis' in locals():
-                    contract_analysis.extraction_status = 'failed'
+                    contract_analysis.extraction_status = ContractAnalysis.ExtractionStatus.FAILED
                     contract_analysis.error_message = str(e)
                     contract_analysis.processing_time = time.time() - start_time
-                    contract_analysis.save()
+                    # Only the status columns; leave the JSON payloads untouched
+                    contract_analysis.save(
+                        update_fields=['extraction_status', 'error_message', 'processing_time']
+                    )
                     logger.error(f"  ✓ Marked analysis {contract_analysis.id} as failed in database")
             except Exception as save_error:
                 logger.error(f"  ✗ Error saving failed status: {str(save_error)}")
             
             raise
     
-    # ============================================================================
-    # STEP 1: SAVE & PREPARE
-    # ============================================================================
-    
-    def _save_and_prepare_contract(
-        self,
-        contract_file: Any,
-        contract_type: str,
-        jurisdiction: str,
-        llm_model: str,
-        user: User
-    ) -> tuple:
-        """
-        Save uploaded contract to database and create analysis record.
-        
-        Args:
-            contract_file: Uploaded file object
-            contract_type: Contract type string
-            jurisdiction: Jurisdiction string
-            llm_model: LLM model string
-            user: Django User object
-        
-        Returns:
-            Tuple of (Contract, ContractAnalysis) database objects
-        """
-        try:
-            # Create Contract record
-            contract = Contract.objects.create(
-                user=user,
-                contract_file=contract_file,
-                contract_type=contract_type,
-                jurisdiction=jurisdiction,
-                llm_model=llm_model
-            )
-            
-            # Create ContractAnalysis record
-            contract_analysis = ContractAnalysis.objects.create(
-                contract=contract,
-                extraction_status='processing'
-            )
-            
-            return contract, contract_analysis
-        
-        except Exception as e:
-            logger.error(f"Error saving contract: {str(e)}")
-            raise
-    
     # ============================================================================
     # STEP 2: EXTRACT PDF TEXT
     # ============================================================================
@@ -428,23 +551,45 @@ class ContractAnalysisService:
     def _extract_contract_text(
         self,
         contract_file: Any,
-        contract_path: str
+        contract_path: str,
+        contract: Optional[Contract] = None
     ) -> str:
         """
         Extract text from uploaded PDF file.
         
+        When a contract is given, text saved by an earlier analysis of it is
+        returned without opening the PDF, and newly extracted text is saved
+        on it for the next analysis.
+        
         Args:
-            contract_file: File object
+            contract_file: PDF contents (bytes) or an open file object, or
+                None to read the file at contract_path
             contract_path: Full path to file on disk
+            contract: Contract the file belongs to (optional)
         
         Returns:
-            Extracted text from PDF
+            Extracted text from PDF, from the first pages up to at least
+            LLM_CONTEXT_CHARS characters (all the prompts use)
         
         Raises:
             ValueError: If PDF extraction fails
         """
+        if contract is not None and contract.extracted_text:
+            logger.debug("Using text saved by an earlier analysis of contract %s", contract.id)
+            return contract.extracted_text
+        
         try:
-            extracted_text = self.processor.extract_text_from_pdf(contract_path)
+            if contract_file is None:
+                extracted_text = self.processor.extract_text_from_pdf(
+                    contract_path, max_chars=LLM_CONTEXT_CHARS
+                )
+            else:
+                if hasattr(contract_file, 'read'):
+                    contract_file.seek(0)
+                    contract_file = contract_file.read()
+                extracted_text = self.processor.extract_text_from_bytes(
+                    contract_file, os.path.basename(contract_path), max_chars=LLM_CONTEXT_CHARS
+                )
             
             # Validate extracted text has meaningful content
             if not extracted_text or len(extracted_text.strip()) < 50:
@@ -453,6 +598,10 @@ class ContractAnalysisService:
                     "Please ensure the PDF contains readable text (not just images/scans)."
                 )
             
+            if contract is not None:
+                contract.extracted_text = extracted_text
+                contract.save(update_fields=['extracted_text'])
+            
             return extracted_text
         
         except Exception as e:
@@ -481,38 +630,25 @@ class ContractAnalysisService:
         try:
             logger.debug("Sending summary analysis request to Groq LLM...")
             
-            # Prepare prompt
-            prompt = PromptTemplate.from_template(SUMMARY_PROMPT)
-            
-            # Create chain WITHOUT JsonOutputParser - we'll parse manually
-            chain = prompt | self.llm
-            
             # Invoke the chain
-            llm_output = chain.invoke({
-                "contract_text": contract_text[:5000],  # Limit input size
+            inputs = {
+                "contract_text": contract_text[:LLM_CONTEXT_CHARS],  # Limit input size
                 "contract_type": contract_type
-            })
-            
-            logger.debug(f"Received summary response from LLM")
+            }
+            raw_text = self._invoke_llm(self._summary_chain, 'summary', inputs)
             
-            # Extract text content from LLM output
-            if hasattr(llm_output, 'content'):
-                raw_text = llm_output.content
-            else:
-                raw_text = str(llm_output)
+            logger.debug("Received summary response from LLM")
             
             # Clean the JSON output (remove markdown code fences)
             clean_text = clean_json_output(raw_text)
             
-            # Parse JSON manually
-            response = json.loads(clean_text)
-            
-            # Validate response using Pydantic
-            validated_summary = SummaryOutput(**response)
+            # Parse and validate in one pass with Pydantic's JSON parser
+            validated_summary = SummaryOutput.model_validate_json(clean_text)
+            self._cache_llm_response('summary', inputs, raw_text)
             
             return validated_summary.model_dump()
         
-        except Exception as e:
+        except LLM_STEP_ERRORS as e:
             logger.error(f"Error analyzing summary: {str(e)}")
             # Return safe defaults instead of failing completely
             return {
@@ -542,46 +678,33 @@ class ContractAnalysisService:
         try:
             logger.debug("Sending clause extraction request to Groq LLM...")
             
-            # Prepare prompt
-            prompt = PromptTemplate.from_template(CLAUSE_EXTRACTION_PROMPT)
-            
-            # Create chain WITHOUT JsonOutputParser - we'll parse manually
-            chain = prompt | self.llm
-            
             # Invoke the chain
-            llm_output = chain.invoke({
-                "contract_text": contract_text[:5000]
-            })
-            
-            logger.debug(f"Received clauses response from LLM")
+            inputs = {
+                "contract_text": contract_text[:LLM_CONTEXT_CHARS]
+            }
+            raw_text = self._invoke_llm(self._clauses_chain, 'clauses', inputs)
             
-            # Extract text content from LLM output
-            if hasattr(llm_output, 'content'):
-                raw_text = llm_output.content
-            else:
-                raw_text = str(llm_output)
+            logger.debug("Received clauses response from LLM")
             
             # Clean the JSON output (remove markdown code fences)
             clean_text = clean_json_output(raw_text)
-            logger.debug(f"Cleaned JSON: {clean_text[:100]}...")
-            
-            # Parse JSON manually
-            response = json.loads(clean_text)
+            logger.debug("Cleaned JSON: %s...", clean_text[:100])
             
-            # Validate response using Pydantic
-            validated_clauses = ClausesOutput(**response)
+            # Parse and validate in one pass with Pydantic's JSON parser
+            validated_clauses = ClausesOutput.model_validate_json(clean_text)
+            self._cache_llm_response('clauses', inputs, raw_text)
             
             return validated_clauses.model_dump()
         
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing JSON from clause extraction: {str(e)}")
+        except ValidationError as e:
+            logger.error(f"Invalid JSON from clause extraction: {str(e)}")
             logger.error(f"Raw response was: {raw_text[:500]}")
             # Return safe defaults
             return {
                 "clauses": [],
                 "total_clauses": 0
             }
-        except Exception as e:
+        except LLM_STEP_ERRORS as e:
             logger.error(f"Error extracting clauses: {str(e)}")
             # Return safe defaults
             return {
@@ -611,6 +734,11 @@ class ContractAnalysisService:
         try:
             comparisons = {}
             
+            # Nothing to compare (e.g. clause extraction fell back to defaults)
+            if not found_clauses:
+                logger.debug("No clauses found - skipping clause comparison")
+                return {}
+            
             # Check if ChromaDB is available
             if not self.chroma_manager.available:
                 logger.debug("ChromaDB not available - skipping clause comparison")
@@ -629,30 +757,19 @@ class ContractAnalysisService:
                 logger.warning(f"Could not access ChromaDB collection: {str(e)}")
                 return {}
             
-            # Search for similar clauses
-            for clause in found_clauses:
-                clause_type = clause.get('type', 'Unknown')
-                clause_text = clause.get('text', '')
-                
-                try:
-                    # Search ChromaDB
-                    similar = self.chroma_manager.search_similar_clauses(
-                        collection_name=collection_name,
-                        query_text=clause_text,
-                        top_k=3
-                    )
-                    
-                    comparisons[clause_type] = {
-                        "found_text": clause_text,
-                        "similar_standards": similar if similar else []
-                    }
-                
-                except Exception as e:
-                    logger.warning(f"Error searching for similar clauses of type {clause_type}: {str(e)}")
-                    comparisons[clause_type] = {
-                        "found_text": clause_text,
-                        "similar_standards": []
-                    }
+            # Search for all clauses in one batched query
+            clause_texts = [clause.get('text', '') for clause in found_clauses]
+            similar_results = self.chroma_manager.search_similar_clauses_bulk(
+                collection_name=collection_name,
+                query_texts=clause_texts,
+                top_k=3
+            )
+            
+            for clause, clause_text, similar in zip(found_clauses, clause_texts, similar_results):
+                comparisons[clause.get('type', 'Unknown')] = {
+                    "found_text": clause_text,
+                    "similar_standards": similar if similar else []
+                }
             
             return comparisons
         
@@ -668,18 +785,23 @@ class ContractAnalysisService:
         self,
         contract_text: str,
         contract_type: str,
-        clauses: List[Dict[str, str]],
-        chromadb_comparisons: Dict[str, Any],
+        clauses: Optional[List[Dict[str, str]]] = None,
+        chromadb_comparisons: Optional[Dict[str, Any]] = None,
         jurisdiction: str = "INDIA"
     ) -> Dict[str, Any]:
         """
         Use Groq LLM to identify risks in the contract.
         
+        The risk prompt only uses the contract text, type and jurisdiction,
+        so analyze_contract() runs this without waiting for clause
+        extraction.
+        
         Args:
             contract_text: Full text extracted from PDF
             contract_type: Type of contract
-            clauses: Extracted clauses
-            chromadb_comparisons: ChromaDB comparison results
+            clauses: Extracted clauses (not used by the current prompt)
+            chromadb_comparisons: ChromaDB comparison results (not used by
+                the current prompt)
             jurisdiction: Jurisdiction for contract (defaults to INDIA)
         
         Returns:
@@ -688,39 +810,26 @@ class ContractAnalysisService:
         try:
             logger.debug("Sending risk analysis request to Groq LLM...")
             
-            # Prepare prompt with context from ChromaDB
-            prompt = PromptTemplate.from_template(RISK_ANALYSIS_PROMPT)
-            
-            # Create chain WITHOUT JsonOutputParser - we'll parse manually
-            chain = prompt | self.llm
-            
             # Invoke the chain with all required variables
-            llm_output = chain.invoke({
-                "contract_text": contract_text[:5000],
+            inputs = {
+                "contract_text": contract_text[:LLM_CONTEXT_CHARS],
                 "contract_type": contract_type,
                 "jurisdiction": jurisdiction
-            })
+            }
+            raw_text = self._invoke_llm(self._risks_chain, 'risks', inputs)
             
             logger.debug("Received risks response from LLM")
             
-            # Extract text content from LLM output
-            if hasattr(llm_output, 'content'):
-                raw_text = llm_output.content
-            else:
-                raw_text = str(llm_output)
-            
             # Clean the JSON output (remove markdown code fences)
             clean_text = clean_json_output(raw_text)
             
-            # Parse JSON manually
-            response = json.loads(clean_text)
-            
-            # Validate response using Pydantic
-            validated_risks = RisksOutput(**response)
+            # Parse and validate in one pass with Pydantic's JSON parser
+            validated_risks = RisksOutput.model_validate_json(clean_text)
+            self._cache_llm_response('risks', inputs, raw_text)
             
             return validated_risks.model_dump()
         
-        except Exception as e:
+        except LLM_STEP_ERRORS as e:
             logger.error(f"Error analyzing risks: {str(e)}")
             # Return safe defaults
             return {
@@ -766,20 +875,29 @@ class ContractAnalysisService:
                 logger.warning(f"Could not load standard clauses: {str(e)}")
                 return []
             
-            # Find missing clauses
+            # Find missing clauses: a standard type counts as found if a found
+            # type equals it or either contains the other. found_types is
+            # already lowercased; exact matches skip the substring scan, and
+            # "standard type inside a found type" is one C-level search of
+            # all found types joined by newlines (clause names have none)
             missing = []
+            found_blob = "\n".join(found_types)
             
             for category in ['critical_clauses', 'important_clauses']:
-                if category in standard_clauses:
-                    for standard_clause in standard_clauses[category]:
-                        standard_type = standard_clause.get('type', '').lower()
-                        
-                        # Check if this clause type was found
-                        if not any(standard_type in found.lower() or found.lower() in standard_type 
-                                  for found in found_types):
-                            missing.append(standard_clause.get('type', 'Unknown'))
+                for standard_clause in standard_clauses.get(category, []):
+                    standard_type = standard_clause.get('type', '').lower()
+                    if standard_type in found_types:
+                        continue
+                    if found_blob and standard_type in found_blob:
+                        continue
+                    if any(found in standard_type for found in found_types):
+                        continue
+                    
+                    missing.append(standard_clause.get('type', 'Unknown'))
+                    if len(missing) == 10:  # Limit to top 10 missing clauses
+                        return missing
             
-            return missing[:10]  # Limit to top 10 missing clauses
+            return missing
         
         except Exception as e:
             logger.error(f"Error finding missing clauses: {str(e)}")
@@ -811,39 +929,26 @@ class ContractAnalysisService:
         try:
             logger.debug("Sending suggestions request to Groq LLM...")
             
-            # Prepare prompt
-            prompt = PromptTemplate.from_template(SUGGESTIONS_PROMPT)
-            
-            # Create chain WITHOUT JsonOutputParser - we'll parse manually
-            chain = prompt | self.llm
-            
             # Invoke the chain with all required variables
-            llm_output = chain.invoke({
-                "contract_text": contract_text[:5000],
+            inputs = {
+                "contract_text": contract_text[:LLM_CONTEXT_CHARS],
                 "contract_type": contract_type,
                 "jurisdiction": jurisdiction
-            })
+            }
+            raw_text = self._invoke_llm(self._suggestions_chain, 'suggestions', inputs)
             
             logger.debug("Received suggestions response from LLM")
             
-            # Extract text content from LLM output
-            if hasattr(llm_output, 'content'):
-                raw_text = llm_output.content
-            else:
-                raw_text = str(llm_output)
-            
             # Clean the JSON output (remove markdown code fences)
             clean_text = clean_json_output(raw_text)
             
-            # Parse JSON manually
-            response = json.loads(clean_text)
-            
-            # Validate response using Pydantic
-            validated_suggestions = SuggestionsOutput(**response)
+            # Parse and validate in one pass with Pydantic's JSON parser
+            validated_suggestions = SuggestionsOutput.model_validate_json(clean_text)
+            self._cache_llm_response('suggestions', inputs, raw_text)
             
             return validated_suggestions.model_dump()
         
-        except Exception as e:
+        except LLM_STEP_ERRORS as e:
             logger.error(f"Error generating suggestions: {str(e)}")
             # Return safe defaults
             return {
@@ -890,13 +995,17 @@ class ContractAnalysisService:
             
             # Store metadata
             contract_analysis.processing_time = processing_time
-            contract_analysis.analysed_at = datetime.now()
+            contract_analysis.extraction_status = ContractAnalysis.ExtractionStatus.COMPLETED
+            contract_analysis.analysed_at = timezone.now()
             contract_analysis.error_message = None
             
-            # Save to database
-            contract_analysis.save()
+            # Save to database (every column but the contract link changed)
+            contract_analysis.save(update_fields=[
+                'summary', 'clauses', 'risks', 'suggestions',
+                'processing_time', 'extraction_status', 'analysed_at', 'error_message'
+            ])
             
-            logger.info(f"Successfully saved analysis {contract_analysis.id} to database (PDF pending)")
+            logger.info("Successfully saved analysis %s to database (PDF pending)", contract_analysis.id)
             return contract_analysis
         
         except Exception as e:
@@ -904,8 +1013,167 @@ class ContractAnalysisService:
             # Update error status
             try:
                 contract_analysis.error_message = str(e)
-                contract_analysis.save()
+                contract_analysis.save(update_fields=['error_message'])
             except:
                 pass
             raise
-    
\ No newline at end of file
+    
+    
+    def _save_clause_records(
+        self,
+        contract: Contract,
+        clauses: List[Dict[str, Any]],
+        risks: List[Dict[str, Any]],
+        chromadb_comparisons: Dict[str, Any]
+    ) -> List[Clause]:
+        """
+        Store one Clause row per extracted clause with a bulk INSERT.
+        
+        Each row gets the highest risk level reported for its clause type
+        and the similarity of the closest standard clause from ChromaDB.
+        Clauses from an earlier analysis of the contract are replaced, and
+        clauses repeating the text of one earlier in the list are skipped.
+        Call inside a transaction so a failed insert keeps the old rows.
+        
+        Args:
+            contract: Contract the clauses belong to
+            clauses: Extracted clauses
+            risks: Identified risks
+            chromadb_comparisons: ChromaDB comparison results by clause type
+        
+        Returns:
+            List of created Clause objects
+        """
+        level_rank = {
+            Clause.RiskLevel.LOW: 0,
+            Clause.RiskLevel.MEDIUM: 1,
+            Clause.RiskLevel.HIGH: 2
+        }
+        risk_levels = {}
+        for risk in risks:
+            level = str(getattr(risk.get('risk_level'), 'value', risk.get('risk_level', ''))).lower()
+            if level not in level_rank:
+                continue
+            clause_type = risk.get('clause_type', '')
+            current = risk_levels.get(clause_type, Clause.RiskLevel.LOW)
+            if level_rank[level] > level_rank[current]:
+                risk_levels[clause_type] = level
+        
+        clause_records = []
+        seen_hashes = set()
+        for clause in clauses:
+            clause_text = clause.get('text', '')
+            text_hash = clause_text_hash(clause_text)
+            if text_hash in seen_hashes:
+                continue
+            seen_hashes.add(text_hash)
+            
+            clause_type = clause.get('type', '')
+            similar = chromadb_comparisons.get(clause_type, {}).get('similar_standards') or {}
+            distances = similar.get('distances') or []
+            clause_records.append(Clause(
+                contract=contract,
+                clause_type=clause_type[:100],
+                clause_text=clause_text,
+                text_hash=text_hash,
+                risk_level=risk_levels.get(clause_type, Clause.RiskLevel.LOW),
+                similarity_score=distance_to_similarity(distances[0]) if distances else 0.0
+            ))
+        
+        # Re-analysis: drop the previous run's rows so (contract, text_hash)
+        # stays unique
+        Clause.objects.filter(contract=contract).delete()
+        return Clause.objects.bulk_create(
+            clause_records,
+            batch_size=settings.CLAUSE_BULK_BATCH_SIZE
+        )
+    
+    def _update_contract_stats(self, contract: Contract, clause_records: List[Clause]) -> None:
+        """
+        Store the high-risk clause count and average similarity on the contract.
+        
+        Args:
+            contract: Contract that was analysed
+            clause_records: Clause rows saved for this analysis
+        """
+        high_risk_count = sum(
+            1 for clause in clause_records
+            if clause.risk_level == Clause.RiskLevel.HIGH
+        )
+        avg_similarity = (
+            sum(clause.similarity_score for clause in clause_records) / len(clause_records)
+            if clause_records else 0.0
+        )
+        
+        # Single UPDATE; doesn't overwrite other fields changed meanwhile
+        Contract.objects.filter(pk=contract.pk).update(
+            high_risk_count=high_risk_count,
+            avg_similarity=avg_similarity
+        )
+
+
+# ============================================================================
+# HELPER FUNCTIONS
+# ============================================================================
+# Global instance for convenient access
+_analysis_service = None
+_analysis_service_lock = Lock()
+
+# Worker pool for analyses started by upload requests
+_analysis_executor = None
+_analysis_executor_lock = Lock()
+
+
+def get_analysis_service() -> ContractAnalysisService:
+    """
+    Get the shared ContractAnalysisService instance.
+    
+    Building the service creates the Groq client, whose HTTP connection pool
+    is only reused if the same instance handles every analysis; a new
+    service per upload pays fresh TCP/TLS handshakes on each LLM call. The
+    service keeps no per-analysis state, so concurrent analysis threads can
+    share it. If construction fails (e.g. GROQ_API_KEY is missing), the
+    error propagates and the next call tries again.
+    
+    Returns:
+        ContractAnalysisService shared instance
+    """
+    global _analysis_service
+    if _analysis_service is None:
+        with _analysis_service_lock:
+            if _analysis_service is None:
+                _analysis_service = ContractAnalysisService()
+    return _analysis_service
+
+
+def get_analysis_executor() -> ThreadPoolExecutor:
+    """
+    Get the shared pool that runs contract analyses in the background.
+    
+    Upload requests return as soon as their analysis is queued here. At most
+    ANALYSIS_MAX_WORKERS analyses run at once; the rest wait with status
+    pending instead of each starting its own thread and competing for the
+    Groq rate limit, CPU and database connections.
+    
+    Returns:
+        ThreadPoolExecutor shared instance
+    """
+    global _analysis_executor
+    if _analysis_executor is None:
+        with _analysis_executor_lock:
+            if _analysis_executor is None:
+                _analysis_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ANALYSIS_MAX_WORKERS', 4),
+                    thread_name_prefix='contract-analysis'
+                )
+                # Pool threads are joined before atexit handlers run, so
+                # cancel queued analyses from threading's own exit hook;
+                # otherwise shutdown waits for every queued analysis
+                threading._register_atexit(_shutdown_analysis_executor)
+    return _analysis_executor
+
+
+def _shutdown_analysis_executor():
+    """Drop queued analyses at process exit; running ones still finish"""
+    if _analysis_executor is not None:
+        _analysis_executor.shutdown(wait=False, cancel_futures=True)
@@ -15,17 +15,32 @@ Functions:
     - find_missing_clauses(): Identify which standard clauses are missing from found clauses
     - get_clause_by_id(): Get specific clause by ID
     - get_all_contract_types(): Get list of all supported contract types
+    - get_contract_type_splits(): Get contract type keys split into type and jurisdiction
+    - clauses_for_chroma(): Convert a contract type's clauses into ChromaDB clause dicts
 """
 
 import json
 import os
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Tuple
 from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4)
+def _parse_clauses_file(json_path: str) -> Dict[str, Any]:
+    """
+    Parse the standard clauses JSON file.
+    
+    Cached by path, so the file is parsed once per process; restart the
+    process to pick up edits to it.
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
 class ContractClauseMapper:
     """
     Service class to manage standard contract clauses for different contract types.
@@ -35,6 +50,8 @@ class ContractClauseMapper:
     _instance = None
     _standard_clauses = None
     _json_file_path = None
+    _flat_clauses_cache = {}
+    _contract_type_splits = None
     
     def __new__(cls):
         """Singleton pattern - ensure only one instance exists"""
@@ -63,8 +80,9 @@ class ContractClauseMapper:
         """Load standard clauses from JSON file"""
         try:
             json_path = self._get_json_path()
-            with open(json_path, 'r', encoding='utf-8') as f:
-                ContractClauseMapper._standard_clauses = json.load(f)
+            ContractClauseMapper._standard_clauses = _parse_clauses_file(json_path)
+            ContractClauseMapper._flat_clauses_cache = {}
+            ContractClauseMapper._contract_type_splits = None
             logger.info(f"Successfully loaded standard clauses from {json_path}")
         except FileNotFoundError:
             error_msg = f"standard_clauses.json not found at {self._get_json_path()}"
@@ -84,6 +102,31 @@ class ContractClauseMapper:
         """
         return list(self._standard_clauses.keys())
     
+    def get_contract_type_splits(self) -> List[Tuple[str, str, str]]:
+        """
+        Get all contract type keys split into contract type and jurisdiction.
+        
+        The split is computed once per load, so callers looping over every
+        contract type don't have to re-parse the keys each time.
+        
+        Returns:
+            List of (key, contract_type, jurisdiction) tuples
+            (e.g., ('SERVICE_AGREEMENT_INDIA', 'SERVICE_AGREEMENT', 'INDIA')).
+            Keys without a jurisdiction suffix default to 'INDIA'.
+        """
+        if self._contract_type_splits is None:
+            splits = []
+            for key in self._standard_clauses.keys():
+                parts = key.rsplit('_', 1)
+                if len(parts) == 2:
+                    contract_type, jurisdiction = parts
+                else:
+                    contract_type = key
+                    jurisdiction = 'INDIA'
+                splits.append((key, contract_type, jurisdiction))
+            ContractClauseMapper._contract_type_splits = splits
+        return list(self._contract_type_splits)
+    
     def get_contract_type_name(self, contract_type_key: str) -> Optional[str]:
         """
         Get the human-readable name of a contract type.
@@ -272,7 +315,7 @@ class ContractClauseMapper:
         all_clauses = self.get_standard_clauses_for_type(contract_type, jurisdiction)
         
         # Normalize found clauses to lowercase for comparison
-        found_lower = [c.lower() for c in found_clause_types]
+        found_lower = {c.lower() for c in found_clause_types}
         
         missing = {
             'missing_critical': [],
@@ -341,20 +384,27 @@ class ContractClauseMapper:
         Returns:
             Flat list of all clauses with their priority information
         """
-        all_clauses = self.get_standard_clauses_for_type(contract_type, jurisdiction)
-        
-        flat_list = []
-        
-        for clause in all_clauses.get('critical_clauses', []):
-            flat_list.append(clause)
-        
-        for clause in all_clauses.get('important_clauses', []):
-            flat_list.append(clause)
-        
-        for clause in all_clauses.get('optional_clauses', []):
-            flat_list.append(clause)
-        
-        return flat_list
+        cache_key = (contract_type, jurisdiction)
+        flat_list = self._flat_clauses_cache.get(cache_key)
+        
+        if flat_list is None:
+            all_clauses = self.get_standard_clauses_for_type(contract_type, jurisdiction)
+            
+            flat_list = []
+            
+            for clause in all_clauses.get('critical_clauses', []):
+                flat_list.append(clause)
+            
+            for clause in all_clauses.get('important_clauses', []):
+                flat_list.append(clause)
+            
+            for clause in all_clauses.get('optional_clauses', []):
+                flat_list.append(clause)
+            
+            self._flat_clauses_cache[cache_key] = flat_list
+        
+        # Return a copy so callers can't modify the cached list
+        return list(flat_list)
     
     def get_clause_recommendations(
         self,
@@ -414,6 +464,7 @@ class ContractClauseMapper:
 # ============================================================================
 # Global instance for convenient access
 _mapper = None
+_mapper_lock = threading.Lock()
 
 
 def get_mapper() -> ContractClauseMapper:
@@ -425,7 +476,9 @@ def get_mapper() -> ContractClauseMapper:
     """
     global _mapper
     if _mapper is None:
-        _mapper = ContractClauseMapper()
+        with _mapper_lock:
+            if _mapper is None:
+                _mapper = ContractClauseMapper()
     return _mapper
 
 
@@ -494,6 +547,29 @@ def get_all_contract_types() -> List[str]:
     return get_mapper().get_all_contract_types()
 
 
+def get_contract_type_splits() -> List[Tuple[str, str, str]]:
+    """Convenience function - Get (key, contract_type, jurisdiction) for all contract types"""
+    return get_mapper().get_contract_type_splits()
+
+
+def clauses_for_chroma(
+    all_clauses: List[Dict[str, Any]],
+    contract_type: str,
+    jurisdiction: str
+) -> List[Dict[str, Any]]:
+    """Convert one contract type's clauses into the dicts ChromaManager stores"""
+    return [
+        {
+            'type': clause.get('type', ''),
+            'text': clause.get('standard_text', clause.get('text', '')),
+            'jurisdiction': jurisdiction,
+            'contract_type': contract_type,
+            'recommendations': clause.get('recommendations', '')
+        }
+        for clause in all_clauses
+    ]
+
+
 def get_contract_type_name(contract_type_key: str) -> Optional[str]:
     """Convenience function - Get human-readable contract type name"""
     return get_mapper().get_contract_type_name(contract_type_key)
@@ -8,6 +8,7 @@ Uses PyMuPDF (fitz) for reliable PDF text extraction.
 import fitz  # PyMuPDF
 import logging
 import os
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +24,7 @@ class ContractProcessor:
     """
 
     @staticmethod
-    def extract_text_from_pdf(file_path: str) -> str:
+    def extract_text_from_pdf(file_path: str, max_chars: Optional[int] = None) -> str:
         """
         Extract all text from a PDF contract file.
         
@@ -34,6 +35,9 @@ class ContractProcessor:
         Args:
             file_path (str): Absolute path to the PDF file
                 Example: "/media/contracts/service_agreement.pdf"
+            max_chars (int, optional): Stop after the page on which the
+                text (with whitespace runs counted as one character)
+                reaches this length. None extracts every page.
         
         Returns:
             str: All extracted text from the PDF
@@ -51,26 +55,77 @@ class ContractProcessor:
             >>> print(text[:100])  # First 100 characters
             "--- Page 1 ---\nScope of Services..."
         """
-        try:
-            # Check if file exists
-            if not os.path.exists(file_path):
-                raise ValueError(f"File not found: {file_path}")
+        # Check if file exists
+        if not os.path.exists(file_path):
+            raise ValueError(f"File not found: {file_path}")
+        
+        return ContractProcessor._extract_text(file_path, max_chars, filename=file_path)
 
+    @staticmethod
+    def extract_text_from_bytes(
+        data: bytes,
+        source: str = "uploaded file",
+        max_chars: Optional[int] = None
+    ) -> str:
+        """
+        Extract all text from a PDF that is already in memory.
+        
+        Same output and errors as extract_text_from_pdf(), for uploads
+        analyzed in the same request, so the file isn't read back from disk
+        right after Django saved it.
+        
+        Args:
+            data (bytes): Contents of the PDF file
+            source (str): Name of the file, used in log and error messages
+            max_chars (int, optional): Same as for extract_text_from_pdf()
+        
+        Returns:
+            str: All extracted text from the PDF, with page markers
+        
+        Raises:
+            ValueError: If the data is not a valid PDF or has no text
+        
+        Example:
+            >>> text = ContractProcessor.extract_text_from_bytes(uploaded.read(), uploaded.name)
+        """
+        return ContractProcessor._extract_text(source, max_chars, stream=data, filetype="pdf")
+
+    @staticmethod
+    def _extract_text(source: str, max_chars: Optional[int] = None, **open_kwargs) -> str:
+        """
+        Open a PDF with fitz.open(**open_kwargs) and extract its text.
+        
+        Shared by extract_text_from_pdf() and extract_text_from_bytes();
+        source names the file in log and error messages. Pages after the
+        one that brings the text to max_chars are not read.
+        """
+        try:
             # Open PDF file
-            doc = fitz.open(file_path)
+            doc = fitz.open(**open_kwargs)
             
             # Check if PDF has pages
             if doc.page_count == 0:
                 doc.close()
                 raise ValueError("PDF file has no pages")
             
-            # Extract text from all pages
-            text = ""
-            for page_num in range(doc.page_count):
-                page = doc[page_num]
-                text += f"\n--- Page {page_num + 1} ---\n"
-                page_text = page.get_text()
-                text += page_text
+            # Extract text page by page, stopping once there is enough
+            parts = []
+            collapsed_chars = 0
+            page_count = doc.page_count
+            for page_num in range(page_count):
+                page_text = doc[page_num].get_text()
+                parts.append(f"\n--- Page {page_num + 1} ---\n")
+                parts.append(page_text)
+                if max_chars is not None:
+                    collapsed_chars += len(" ".join(page_text.split())) + 1
+                    if collapsed_chars >= max_chars:
+                        if page_num + 1 < page_count:
+                            logger.debug(
+                                f"Read {page_num + 1} of {page_count} pages from {source}; "
+                                f"reached {max_chars} characters"
+                            )
+                        break
+            text = "".join(parts)
             
             # Close the document
             doc.close()
@@ -87,19 +142,19 @@ class ContractProcessor:
             word_count = len(text.split())
             logger.info(
                 f"Successfully extracted {char_count} characters "
-                f"({word_count} words) from PDF: {file_path}"
+                f"({word_count} words) from PDF: {source}"
             )
             
             return text
             
-        except fitz.FileError as e:
-            logger.error(f"PDF file error for {file_path}: {str(e)}")
+        except fitz.FileDataError as e:
+            logger.error(f"PDF file error for {source}: {str(e)}")
             raise ValueError(f"Invalid or corrupted PDF file: {str(e)}")
         except ValueError:
             # Re-raise ValueError with our custom messages
             raise
         except Exception as e:
-            logger.error(f"Error extracting PDF {file_path}: {str(e)}")
+            logger.error(f"Error extracting PDF {source}: {str(e)}")
             raise ValueError(f"Failed to extract text from PDF: {str(e)}")
 
     @staticmethod
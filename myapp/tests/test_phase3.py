@@ -14,15 +14,32 @@ Run tests with:
 
 import os
 import tempfile
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase
+from myapp.models import Clause, Contract
 from myapp.services import (
     ContractProcessor,
     ChromaManager,
+    get_chroma_manager,
     get_standard_clauses_for_type,
     get_critical_clauses_for_type,
     is_clause_standard,
     find_missing_clauses,
 )
+from myapp.services.chroma_manager import (
+    NUMPY_AVAILABLE,
+    ONNX_EMBEDDINGS_AVAILABLE,
+    clause_id,
+    distance_to_similarity,
+    distances_to_similarities,
+    is_clause_id,
+)
+from myapp.services.contract_analysis_service import (
+    ContractAnalysisService,
+    get_analysis_executor,
+    llm_excerpt,
+)
 from myapp.services.prompts import (
     get_summary_prompt,
     get_clause_extraction_prompt,
@@ -100,6 +117,32 @@ class ContractProcessorTests(TestCase):
         self.assertGreater(len(text), 0, "Extracted text should not be empty")
         self.assertIn("Scope of Services", text, "Extracted text should contain expected content")
 
+    def test_extract_text_from_bytes_matches_file(self):
+        """Test extracting from in-memory PDF bytes gives the same text as from disk"""
+        if not self.has_reportlab:
+            self.skipTest("reportlab not available")
+        
+        with open(self.pdf_path, 'rb') as f:
+            text = ContractProcessor.extract_text_from_bytes(f.read(), "contract.pdf")
+        
+        self.assertEqual(text, ContractProcessor.extract_text_from_pdf(self.pdf_path))
+        with self.assertRaises(ValueError):
+            ContractProcessor.extract_text_from_bytes(b"not a pdf")
+
+    def test_extraction_stops_at_max_chars(self):
+        """Test pages after the one reaching max_chars are not extracted"""
+        import fitz
+        doc = fitz.open()
+        for page_num in range(3):
+            doc.new_page().insert_text((72, 72), f"Clause {page_num + 1}: payment within 30 days.")
+        data = doc.tobytes()
+        doc.close()
+        
+        text = ContractProcessor.extract_text_from_bytes(data, max_chars=10)
+        self.assertIn("Clause 1", text)
+        self.assertNotIn("--- Page 2 ---", text)
+        self.assertIn("Clause 3", ContractProcessor.extract_text_from_bytes(data))
+
     def test_extract_text_with_nonexistent_file(self):
         """Test text extraction with nonexistent file"""
         with self.assertRaises(ValueError) as context:
@@ -119,6 +162,43 @@ class ChromaManagerTests(TestCase):
         """Test ChromaDB Manager initializes correctly"""
         self.assertIsNotNone(self.manager.client, "ChromaDB client should be initialized")
 
+    def test_get_chroma_manager_reuses_instance(self):
+        """Test the shared accessor returns the same ChromaManager"""
+        first = get_chroma_manager()
+        second = get_chroma_manager()
+        if not first.available:
+            self.skipTest("ChromaDB not available")
+        self.assertIs(first, second, "Shared ChromaManager should be reused")
+
+    def test_warm_up_runs_one_forward_pass(self):
+        """Test warm-up encodes once and reports whether the model works"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        with mock.patch.object(self.manager, '_encode', return_value=[[1.0]]) as encode, \
+                mock.patch.object(self.manager, '_warm_up_collections', return_value=0):
+            self.assertTrue(self.manager.warm_up())
+        encode.assert_called_once()
+        with mock.patch.object(self.manager, '_encode', side_effect=RuntimeError("no model")):
+            self.assertFalse(self.manager.warm_up())
+
+    def test_warm_up_queries_stored_collections(self):
+        """Test warm-up queries each non-empty collection once"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        empty, stored = mock.MagicMock(), mock.MagicMock()
+        empty.count.return_value = 0
+        stored.count.return_value = 5
+        handles = {'empty': empty, 'stored': stored}
+        listed = [mock.Mock(), mock.Mock()]
+        listed[0].name, listed[1].name = 'empty', 'stored'
+        with mock.patch.object(self.manager.client, 'list_collections', return_value=listed), \
+                mock.patch.object(self.manager, 'get_or_create_collection', side_effect=handles.get):
+            warmed = self.manager._warm_up_collections([0.6, 0.8])
+
+        self.assertEqual(warmed, 1)
+        empty.query.assert_not_called()
+        stored.query.assert_called_once_with(query_embeddings=[[0.6, 0.8]], n_results=1)
+
     def test_get_or_create_collection(self):
         """Test creating and retrieving a collection"""
         collection_name = "test_service_agreement_india"
@@ -130,6 +210,25 @@ class ChromaManagerTests(TestCase):
         collection2 = self.manager.get_or_create_collection(collection_name)
         self.assertIsNotNone(collection2, "Collection should be retrieved")
 
+    def test_collection_handles_are_cached(self):
+        """Test repeated lookups reuse the handle until the collection is deleted"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        collection_name = "test_cached_collection"
+        with mock.patch.object(
+            self.manager.client,
+            'get_or_create_collection',
+            wraps=self.manager.client.get_or_create_collection
+        ) as get_or_create:
+            first = self.manager.get_or_create_collection(collection_name)
+            second = self.manager.get_or_create_collection(collection_name)
+            self.assertIs(first, second)
+            self.assertEqual(get_or_create.call_count, 1)
+
+            self.manager.delete_collection(collection_name)
+            self.manager.get_or_create_collection(collection_name)
+            self.assertEqual(get_or_create.call_count, 2)
+
     def test_add_standard_clauses(self):
         """Test adding standard clauses to ChromaDB"""
         collection_name = "test_add_clauses"
@@ -160,6 +259,133 @@ class ChromaManagerTests(TestCase):
         
         self.assertTrue(added, "Should successfully add clauses")
 
+    def test_add_standard_clauses_batches_calls(self):
+        """Test clauses are sent to ChromaDB in batches, not one by one"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        clauses = [
+            {"type": f"Clause {i}", "text": f"Clause text {i}"}
+            for i in range(5)
+        ]
+        collection = mock.MagicMock()
+        collection.get.return_value = {'ids': []}
+        with mock.patch.object(self.manager, 'get_or_create_collection', return_value=collection), \
+                self.settings(CHROMA_BULK_BATCH_SIZE=2):
+            self.manager.add_standard_clauses("test_batches", clauses)
+        
+        self.assertEqual(collection.add.call_count, 3, "5 clauses in batches of 2 need 3 calls")
+        sent_ids = [i for call in collection.add.call_args_list for i in call.kwargs['ids']]
+        self.assertEqual(sent_ids, [clause_id(c["type"], c["text"]) for c in clauses])
+
+    def test_add_standard_clauses_skips_stored_clauses(self):
+        """Test clauses already in the collection are not embedded or added again"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        clauses = [
+            {"type": "Payment Terms", "text": "Payment within 30 days"},
+            {"type": "Termination", "text": "Either party may terminate"},
+        ]
+        collection = mock.MagicMock()
+        collection.get.return_value = {'ids': [clause_id("Payment Terms", "Payment within 30 days")]}
+        with mock.patch.object(self.manager, 'get_or_create_collection', return_value=collection), \
+                mock.patch.object(self.manager, '_encode', return_value=None) as encode:
+            added = self.manager.add_standard_clauses("test_skip", clauses)
+        
+        self.assertEqual(added, 1)
+        encode.assert_called_once_with(["Either party may terminate"])
+        self.assertEqual(
+            collection.add.call_args.kwargs['ids'],
+            [clause_id("Termination", "Either party may terminate")]
+        )
+
+    def test_add_standard_clauses_removes_legacy_ids(self):
+        """Test records with pre-hash positional IDs are replaced, not duplicated"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        clauses = [{"type": "Payment Terms", "text": "Payment within 30 days"}]
+        collection = mock.MagicMock()
+        collection.get.return_value = {'ids': ["test_legacy_clause_0"]}
+        with mock.patch.object(self.manager, 'get_or_create_collection', return_value=collection), \
+                mock.patch.object(self.manager, '_encode', return_value=None):
+            added = self.manager.add_standard_clauses("test_legacy", clauses)
+        
+        collection.delete.assert_called_once_with(ids=["test_legacy_clause_0"])
+        self.assertEqual(added, 1)
+        self.assertTrue(is_clause_id(collection.add.call_args.kwargs['ids'][0]))
+
+    def test_add_standard_clauses_passes_precomputed_embeddings(self):
+        """Test precomputed embeddings are handed to ChromaDB with the clauses"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        clauses = [{"type": "Payment Terms", "text": "Payment within 30 days"}]
+        collection = mock.MagicMock()
+        collection.get.return_value = {'ids': []}
+        with mock.patch.object(self.manager, 'get_or_create_collection', return_value=collection), \
+                mock.patch.object(self.manager, '_embed_and_cache', return_value=[[0.6, 0.8]]):
+            self.manager.add_standard_clauses("test_embeddings", clauses)
+        
+        self.assertEqual(collection.add.call_args.kwargs['embeddings'], [[0.6, 0.8]])
+
+    def test_add_standard_clauses_multi_reports_each_collection(self):
+        """Test every collection is filled and a failure doesn't stop the others"""
+        def fake_add(collection_name, clauses):
+            if collection_name == "broken":
+                raise RuntimeError("disk full")
+            return len(clauses)
+
+        with mock.patch.object(self.manager, 'add_standard_clauses', side_effect=fake_add):
+            results = self.manager.add_standard_clauses_multi({
+                "first": [{"type": "A", "text": "a"}],
+                "broken": [{"type": "B", "text": "b"}],
+                "second": [{"type": "C", "text": "c"}, {"type": "D", "text": "d"}],
+            })
+
+        self.assertEqual(list(results), ["first", "broken", "second"])
+        self.assertEqual(results["first"], (1, None))
+        self.assertEqual(results["broken"], (0, "disk full"))
+        self.assertEqual(results["second"], (2, None))
+
+    def test_add_standard_clauses_background(self):
+        """Test background loads run off the calling thread and report results"""
+        with mock.patch.object(self.manager, 'add_standard_clauses', return_value=3):
+            future = self.manager.add_standard_clauses_background({
+                "first": [{"type": "A", "text": "a"}],
+            })
+            self.assertEqual(future.result(timeout=10), {"first": (3, None)})
+
+    def test_embeddings_are_cached_on_disk(self):
+        """Test only uncached texts are embedded, and the cache survives a new manager"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.manager.persist_dir = cache_dir
+            with mock.patch.object(self.manager, '_encode', return_value=[[0.6, 0.8]]) as encode:
+                self.manager._embed_and_cache(["Payment within 30 days"])
+                encode.return_value = [[1.0, 0.0]]
+                embeddings = self.manager._embed_and_cache(
+                    ["Payment within 30 days", "Either party may terminate"]
+                )
+            
+            encode.assert_called_with(["Either party may terminate"])
+            self.assertEqual(
+                [[round(x, 4) for x in e] for e in embeddings],
+                [[0.6, 0.8], [1.0, 0.0]]
+            )
+            
+            fresh = ChromaManager()
+            fresh.persist_dir = cache_dir
+            with mock.patch.object(fresh, '_encode') as encode:
+                fresh._embed_and_cache(["Either party may terminate"])
+            encode.assert_not_called()
+
+    def test_cpu_encoder_uses_onnx_runtime(self):
+        """Test batch encoding on a CPU-only host uses the ONNX Runtime model"""
+        if not ONNX_EMBEDDINGS_AVAILABLE:
+            self.skipTest("ONNX embedding function not available")
+        with mock.patch('myapp.services.chroma_manager._get_torch_device', return_value='cpu'):
+            encoder = ChromaManager()._get_encoder()
+        self.assertEqual(type(encoder).__name__, 'ONNXMiniLM_L6_V2')
+
     def test_search_similar_clauses(self):
         """Test searching for similar clauses"""
         collection_name = "test_search_clauses"
@@ -188,6 +414,142 @@ class ChromaManagerTests(TestCase):
         self.assertIn('documents', results, "Results should have 'documents' key")
         self.assertIn('metadatas', results, "Results should have 'metadatas' key")
 
+    def test_search_similar_clauses_bulk(self):
+        """Test many query texts are searched in one call with aligned results"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        collection = mock.MagicMock()
+        collection.query.return_value = {
+            'ids': [['a'], ['b']],
+            'documents': [['Doc A'], ['Doc B']],
+            'metadatas': [[{'type': 'A'}], [{'type': 'B'}]],
+            'distances': [[0.1], [0.2]],
+        }
+        with mock.patch.object(self.manager, 'get_or_create_collection', return_value=collection), \
+                mock.patch.object(self.manager, '_encode', return_value=None):
+            results = self.manager.search_similar_clauses_bulk(
+                "test_bulk_search",
+                ["first query", "second query"],
+                top_k=1
+            )
+
+        collection.query.assert_called_once_with(
+            query_texts=["first query", "second query"],
+            n_results=1
+        )
+        self.assertEqual([r['documents'] for r in results], [['Doc A'], ['Doc B']])
+        self.assertEqual([r['distances'] for r in results], [[0.1], [0.2]])
+
+    def test_search_with_precomputed_embedding(self):
+        """Test a supplied query embedding is used instead of the query text"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        collection = mock.MagicMock()
+        collection.query.return_value = {
+            'ids': [['a']],
+            'documents': [['Doc A']],
+            'metadatas': [[{'type': 'A'}]],
+            'distances': [[0.1]],
+        }
+        with mock.patch.object(self.manager, 'get_or_create_collection', return_value=collection):
+            result = self.manager.search_similar_clauses(
+                "test_embedding_search", "payment terms", top_k=1, query_embedding=[0.6, 0.8]
+            )
+
+        collection.query.assert_called_once_with(query_embeddings=[[0.6, 0.8]], n_results=1)
+        self.assertEqual(result['documents'], ['Doc A'])
+
+    def test_short_queries_are_not_searched(self):
+        """Test empty and very short query texts return empty results without a query"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        collection = mock.MagicMock()
+        collection.query.return_value = {
+            'ids': [['a']],
+            'documents': [['Doc A']],
+            'metadatas': [[{'type': 'A'}]],
+            'distances': [[0.1]],
+        }
+        with mock.patch.object(self.manager, 'get_or_create_collection', return_value=collection), \
+                mock.patch.object(self.manager, '_encode', return_value=None):
+            self.assertEqual(self.manager.search_similar_clauses("test_short", "  ")['ids'], [])
+            results = self.manager.search_similar_clauses_bulk(
+                "test_short", ["", "n/a", "payment terms"], top_k=1
+            )
+
+        collection.query.assert_called_once_with(query_texts=["payment terms"], n_results=1)
+        self.assertEqual([r['ids'] for r in results], [[], [], ['a']])
+
+    def test_repeated_searches_are_cached(self):
+        """Test a repeated search skips ChromaDB until the collection changes"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        collection = mock.MagicMock()
+        collection.query.return_value = {
+            'ids': [['a']],
+            'documents': [['Doc A']],
+            'metadatas': [[{'type': 'A'}]],
+            'distances': [[0.1]],
+        }
+        with mock.patch.object(self.manager, 'get_or_create_collection', return_value=collection), \
+                mock.patch.object(self.manager, '_encode', return_value=None):
+            first = self.manager.search_similar_clauses("test_cache", "payment terms", top_k=1)
+            first['documents'].append("changed by caller")
+            second = self.manager.search_similar_clauses_bulk("test_cache", ["payment terms"], top_k=1)[0]
+            self.assertEqual(collection.query.call_count, 1)
+            self.assertEqual(second['documents'], ['Doc A'])
+            self.manager.search_similar_clauses("test_cache", "Payment\n  Terms ", top_k=1)
+            self.assertEqual(collection.query.call_count, 1)
+
+            self.manager.delete_collection("test_cache")
+            self.manager.search_similar_clauses("test_cache", "payment terms", top_k=1)
+            self.assertEqual(collection.query.call_count, 2)
+
+    def test_reworded_searches_use_semantic_cache(self):
+        """Test a query with a near-identical embedding reuses earlier results"""
+        if not self.manager.available or not NUMPY_AVAILABLE:
+            self.skipTest("ChromaDB or NumPy not available")
+        collection = mock.MagicMock()
+        collection.query.return_value = {
+            'ids': [['a']],
+            'documents': [['Doc A']],
+            'metadatas': [[{'type': 'A'}]],
+            'distances': [[0.1]],
+        }
+        with mock.patch.object(self.manager, 'get_or_create_collection', return_value=collection):
+            with mock.patch.object(self.manager, '_encode', return_value=[[0.6, 0.8]]):
+                self.manager.search_similar_clauses_bulk("test_semantic", ["Seller pays within 30 days"], top_k=1)
+            with mock.patch.object(self.manager, '_encode', return_value=[[0.61, 0.79]]):
+                close = self.manager.search_similar_clauses_bulk("test_semantic", ["Buyer pays within 30 days"], top_k=1)
+            self.assertEqual(collection.query.call_count, 1)
+            self.assertEqual(close[0]['documents'], ['Doc A'])
+            
+            with mock.patch.object(self.manager, '_encode', return_value=[[0.8, -0.6]]):
+                self.manager.search_similar_clauses_bulk("test_semantic", ["Either party may terminate"], top_k=1)
+            self.assertEqual(collection.query.call_count, 2)
+
+    def test_compact_collection_keeps_records(self):
+        """Test compacting rewrites every record without re-embedding"""
+        if not self.manager.available:
+            self.skipTest("ChromaDB not available")
+        collection_name = "test_compact_collection"
+        self.manager.delete_collection(collection_name)
+        clauses = [
+            {"type": "Payment Terms", "text": "Payment within 30 days"},
+            {"type": "Termination", "text": "Either party may terminate"},
+        ]
+        with mock.patch.object(self.manager, '_embed_and_cache', return_value=[[0.6, 0.8], [1.0, 0.0]]):
+            self.manager.add_standard_clauses(collection_name, clauses)
+        
+        self.assertEqual(self.manager.compact_collection(collection_name), 2)
+        records = self.manager.get_or_create_collection(collection_name).get(
+            include=['documents', 'embeddings']
+        )
+        self.assertEqual(sorted(records['documents']), ["Either party may terminate", "Payment within 30 days"])
+        self.assertEqual(len(records['embeddings'][0]), 2)
+        self.assertEqual(self.manager.compact_collection("test_compact_missing"), 0)
+        self.manager.delete_collection(collection_name)
+
     def test_delete_collection(self):
         """Test deleting a collection"""
         collection_name = "test_delete_collection"
@@ -206,6 +568,210 @@ class ChromaManagerTests(TestCase):
         self.assertTrue(deleted, "Should successfully delete collection")
 
 
+class DistanceToSimilarityTests(TestCase):
+    """Test conversion of cosine distances into similarity scores"""
+
+    def test_exact_match_is_full_similarity(self):
+        """A distance of 0 means identical vectors, not zero similarity"""
+        self.assertEqual(distance_to_similarity(0.0), 1.0)
+
+    def test_distance_is_clamped(self):
+        """Distances beyond 1 (opposite vectors) clamp to 0 similarity"""
+        self.assertAlmostEqual(distance_to_similarity(0.25), 0.75)
+        self.assertEqual(distance_to_similarity(1.5), 0.0)
+        self.assertEqual(distance_to_similarity(None), 0.0)
+
+    def test_vectorized_matches_scalar(self):
+        """Whole-result conversion gives the same values as the scalar helper"""
+        distances = [0.0, 0.25, 1.5, None]
+        self.assertEqual(
+            distances_to_similarities(distances),
+            [distance_to_similarity(d) for d in distances]
+        )
+
+
+class LlmExcerptTests(TestCase):
+    """Test the contract excerpt sent to the LLM"""
+
+    def test_layout_whitespace_is_collapsed(self):
+        """Test padding and blank lines from PDF layout don't use up the budget"""
+        text = "--- Page 1 ---\nParty   A\t\tPays\n\n\n   \nParty B"
+        self.assertEqual(llm_excerpt(text), "--- Page 1 ---\nParty A Pays\n\nParty B")
+
+    def test_cut_falls_on_word_boundary(self):
+        """Test long text is cut at whitespace within the limit"""
+        excerpt = llm_excerpt("payment terms apply", limit=16)
+        self.assertEqual(excerpt, "payment terms")
+
+
+class LlmResponseCacheTests(TestCase):
+    """Test identical LLM requests are answered from the cache"""
+
+    def setUp(self):
+        cache.clear()
+        # Skip __init__, which needs a Groq API key
+        self.service = ContractAnalysisService.__new__(ContractAnalysisService)
+        self.service.llm = mock.Mock(model_name="test-model")
+        self.chain = mock.Mock()
+
+    def test_repeated_request_uses_cache(self):
+        """Test the second identical request doesn't call the LLM"""
+        self.service._summary_chain = self.chain
+        self.chain.invoke.return_value = mock.Mock(
+            content='```json\n{"summary": "ok", "contract_type": "NDA"}\n```'
+        )
+        
+        first = self.service._analyze_summary("Payment within 30 days", "NDA")
+        second = self.service._analyze_summary("Payment within 30 days", "NDA")
+        
+        self.assertEqual(first, second)
+        self.chain.invoke.assert_called_once()
+
+    def test_invalid_response_is_not_cached(self):
+        """Test replies that aren't JSON or fail the schema are requested again"""
+        self.service._summary_chain = self.chain
+        for content in ["Sorry, I can't help with that", '{"parties": "nobody"}']:
+            self.chain.invoke.reset_mock()
+            self.chain.invoke.return_value = mock.Mock(content=content)
+            self.service._analyze_summary("Payment within 30 days", "NDA")
+            self.service._analyze_summary("Payment within 30 days", "NDA")
+            self.assertEqual(self.chain.invoke.call_count, 2)
+
+    def test_edited_prompt_is_not_served_from_cache(self):
+        """Test changing a prompt template invalidates its cached replies"""
+        self.service._summary_chain = self.chain
+        self.chain.invoke.return_value = mock.Mock(
+            content='{"summary": "ok", "contract_type": "NDA"}'
+        )
+        self.service._analyze_summary("Payment within 30 days", "NDA")
+        with mock.patch.dict(
+            'myapp.services.contract_analysis_service._PROMPT_HASHES',
+            {'summary': 'edited'}
+        ):
+            self.service._analyze_summary("Payment within 30 days", "NDA")
+        self.assertEqual(self.chain.invoke.call_count, 2)
+
+
+class LlmStepErrorTests(TestCase):
+    """Test LLM steps recover from bad replies but not from bugs"""
+
+    def setUp(self):
+        cache.clear()
+        self.service = ContractAnalysisService.__new__(ContractAnalysisService)
+        self.service.llm = mock.Mock(model_name="test-model")
+        self.service._summary_chain = mock.Mock()
+
+    def test_invalid_reply_returns_defaults(self):
+        """Test a reply that fails schema validation falls back to defaults"""
+        self.service._summary_chain.invoke.return_value = mock.Mock(content='{"parties": "nobody"}')
+        summary = self.service._analyze_summary("Payment within 30 days", "NDA")
+        self.assertEqual(summary["summary"], "Unable to generate summary")
+
+    def test_non_json_reply_returns_defaults(self):
+        """Test a reply that isn't JSON falls back to defaults"""
+        self.service._summary_chain.invoke.return_value = mock.Mock(content="Here is the summary:")
+        summary = self.service._analyze_summary("Payment within 30 days", "NDA")
+        self.assertEqual(summary["parties"], [])
+
+    def test_unexpected_error_propagates(self):
+        """Test a programming error fails the step instead of being hidden"""
+        self.service._summary_chain.invoke.side_effect = AttributeError("bug")
+        with self.assertRaises(AttributeError):
+            self.service._analyze_summary("Payment within 30 days", "NDA")
+
+
+class FindMissingClausesTests(TestCase):
+    """Test the analysis service's missing-clause matching"""
+
+    def test_partial_type_names_count_as_found(self):
+        """Test a standard type matches found types equal to, inside or containing it"""
+        service = ContractAnalysisService.__new__(ContractAnalysisService)
+        service.clause_mapper = mock.Mock()
+        service.clause_mapper.get_standard_clauses_for_type.return_value = {
+            'critical_clauses': [{'type': 'Payment Terms'}, {'type': 'Termination'}],
+            'important_clauses': [{'type': 'Confidentiality'}, {'type': 'Governing Law'}],
+        }
+        found = [
+            {'type': 'payment terms'},
+            {'type': 'Termination for Convenience'},
+            {'type': 'Law'},
+        ]
+        
+        self.assertEqual(
+            service._find_missing_clauses(found, 'SERVICE_AGREEMENT'),
+            ['Confidentiality']
+        )
+        self.assertEqual(len(service._find_missing_clauses([], 'SERVICE_AGREEMENT')), 4)
+
+
+class ExtractedTextReuseTests(TestCase):
+    """Test contract text is extracted once and reused on re-analysis"""
+
+    def setUp(self):
+        self.service = ContractAnalysisService.__new__(ContractAnalysisService)
+        self.service.processor = mock.Mock()
+        self.text = "Payment shall be made within 30 days of invoice. " * 3
+
+    def test_first_extraction_is_saved(self):
+        """Test newly extracted text is stored on the contract"""
+        self.service.processor.extract_text_from_bytes.return_value = self.text
+        contract = mock.Mock(extracted_text='')
+        
+        text = self.service._extract_contract_text(b"%PDF", "/media/c.pdf", contract=contract)
+        
+        self.assertEqual(text, self.text)
+        self.assertEqual(contract.extracted_text, self.text)
+        contract.save.assert_called_once_with(update_fields=['extracted_text'])
+
+    def test_saved_text_skips_the_pdf(self):
+        """Test text saved by an earlier analysis is returned without parsing"""
+        contract = mock.Mock(extracted_text=self.text)
+        
+        text = self.service._extract_contract_text(None, "/media/c.pdf", contract=contract)
+        
+        self.assertEqual(text, self.text)
+        self.service.processor.extract_text_from_pdf.assert_not_called()
+        contract.save.assert_not_called()
+
+
+class ClauseRecordTests(TestCase):
+    """Test clause rows are replaced when a contract is analyzed again"""
+
+    def test_previous_rows_are_deleted_before_insert(self):
+        """Test existing rows go first so (contract, text_hash) stays unique"""
+        service = ContractAnalysisService.__new__(ContractAnalysisService)
+        contract = Contract(id=1)
+        clauses = [
+            {'type': 'Payment Terms', 'text': 'Payment within 30 days'},
+            {'type': 'Payment Terms', 'text': 'Payment within 30 days'},
+        ]
+        manager = mock.Mock()
+        manager.bulk_create.side_effect = lambda records, batch_size: records
+        
+        with mock.patch.object(Clause, 'objects', manager):
+            records = service._save_clause_records(contract, clauses, [], {})
+        
+        manager.filter.assert_called_once_with(contract=contract)
+        manager.filter.return_value.delete.assert_called_once()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(
+            [c[0] for c in manager.mock_calls if c[0] in ('filter().delete', 'bulk_create')],
+            ['filter().delete', 'bulk_create']
+        )
+
+
+class AnalysisExecutorTests(TestCase):
+    """Test uploads share one bounded analysis pool"""
+
+    def test_executor_is_shared_and_bounded(self):
+        """Test every caller gets the same pool sized from settings"""
+        from django.conf import settings
+        executor = get_analysis_executor()
+        self.assertIs(executor, get_analysis_executor())
+        self.assertEqual(executor._max_workers, settings.ANALYSIS_MAX_WORKERS)
+        self.assertEqual(executor.submit(lambda: 42).result(timeout=5), 42)
+
+
 class PromptsTests(TestCase):
     """Test prompt template functionality"""
 
@@ -23,6 +23,8 @@ from myapp.services.contract_clause_mapping import (
     get_important_clauses_for_type,
     get_optional_clauses_for_type,
     get_all_contract_types,
+    get_contract_type_splits,
+    clauses_for_chroma,
     is_clause_standard,
     find_missing_clauses,
     get_clause_by_id,
@@ -59,6 +61,15 @@ class BasicLoaderTests(TestCase):
             self.assertIn('contract_type', contract_data)
             self.assertIn('jurisdiction', contract_data)
             self.assertIn('critical_clauses', contract_data)
+    
+    def test_flat_clauses_are_cached_copies(self):
+        """Verify flat clause lists are memoized but callers get their own list"""
+        mapper = get_mapper()
+        first = mapper.get_all_clauses_flat('SERVICE_AGREEMENT', 'INDIA')
+        first.append({'type': 'Injected'})
+        second = mapper.get_all_clauses_flat('SERVICE_AGREEMENT', 'INDIA')
+        self.assertNotIn({'type': 'Injected'}, second)
+        self.assertIn(('SERVICE_AGREEMENT', 'INDIA'), mapper._flat_clauses_cache)
 
 
 class ContractTypeLoadingTests(TestCase):
@@ -85,6 +96,30 @@ class ContractTypeLoadingTests(TestCase):
                 self.assertIn(key, self.all_types, 
                             f"Should have {base_type} for {jurisdiction}")
     
+    def test_contract_type_splits_match_keys(self):
+        """Verify pre-split contract types line up with the raw keys"""
+        splits = get_contract_type_splits()
+        self.assertEqual([key for key, _, _ in splits], self.all_types)
+        self.assertIn(
+            ('SERVICE_AGREEMENT_INDIA', 'SERVICE_AGREEMENT', 'INDIA'),
+            splits
+        )
+    
+    def test_clauses_for_chroma(self):
+        """Verify clauses are converted into the dicts stored in ChromaDB"""
+        clauses = clauses_for_chroma(
+            [{'type': 'Termination', 'standard_text': 'Either party may terminate'}],
+            'SERVICE_AGREEMENT',
+            'INDIA'
+        )
+        self.assertEqual(clauses, [{
+            'type': 'Termination',
+            'text': 'Either party may terminate',
+            'jurisdiction': 'INDIA',
+            'contract_type': 'SERVICE_AGREEMENT',
+            'recommendations': ''
+        }])
+    
     def test_total_contract_types_count(self):
         """Verify we have exactly 15 contract type combinations"""
         expected_count = len(self.expected_base_types) * len(self.expected_jurisdictions)
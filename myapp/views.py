@@ -4,6 +4,7 @@ from django.http import JsonResponse, FileResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_protect
 from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction
 from django.contrib.auth import get_user_model
 from django.contrib.auth import authenticate,login,logout
 from django.contrib.auth.decorators import login_required
@@ -136,7 +137,7 @@ def view_contracts(request):
     # Fetch all analyses for the logged-in user's contracts
     analyses = ContractAnalysis.objects.filter(
         contract__user=request.user
-    ).select_related('contract').order_by('-analysed_at')
+    ).list_view().select_related('contract').order_by('-analysed_at')
     
     # Prepare data for template
     analysis_data = []
@@ -376,8 +377,7 @@ def feedback(request):
                 user=request.user,
                 category=category,
                 rating=rating_int,
-                message=message,
-                date=str(__import__('datetime').datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                message=message
             )
             feedback_obj.save()
 
@@ -427,7 +427,7 @@ def get_users_ajax(request):
 def get_contracts_ajax(request):
     """Return all contracts as JSON for AJAX request"""
     try:
-        contracts = Contract.objects.all().order_by('-uploaded_at')
+        contracts = Contract.objects.list_view().select_related('user').order_by('-uploaded_at')
         contracts_data = []
         for contract in contracts:
             contracts_data.append({
@@ -486,7 +486,7 @@ def get_feedback_ajax(request):
         feedbacks_data = []
         for feedback in feedbacks:
             feedbacks_data.append({
-                'date': feedback.date,
+                'date': feedback.date.strftime('%Y-%m-%d %H:%M:%S'),
                 'category': feedback.category,
                 'rating': feedback.rating,
                 'message': feedback.message,
@@ -509,11 +509,10 @@ def get_feedback_ajax(request):
 # PHASE 6: CONTRACT ANALYSIS API ENDPOINTS
 # ============================================================================
 
-from .services import ContractAnalysisService
+from .services import get_analysis_executor, get_analysis_service
 from .models import ContractAnalysis
 import json
 import asyncio
-from threading import Thread
 
 logger = logging.getLogger(__name__)
 
@@ -584,34 +583,45 @@ def upload_and_analyze_contract(request):
         logger.info(f"  - LLM Model: {llm_model}")
         logger.info("="*80)
         
-        # Create Contract and ContractAnalysis records FIRST
+        # Create Contract and ContractAnalysis records FIRST, in one
+        # transaction (committed before the analysis thread reads them)
         logger.info("Creating Contract and ContractAnalysis database records...")
-        contract = Contract.objects.create(
-            user=request.user,
-            contract_file=contract_file,
-            contract_type=contract_type,
-            jurisdiction=jurisdiction,
-            llm_model=llm_model
-        )
+        with transaction.atomic():
+            contract = Contract.objects.create(
+                user=request.user,
+                contract_file=contract_file,
+                contract_type=contract_type,
+                jurisdiction=jurisdiction,
+                llm_model=llm_model
+            )
+            contract_analysis = ContractAnalysis.objects.create(
+                contract=contract
+            )
         logger.info(f"✓ Contract created with ID: {contract.id}")
-        
-        contract_analysis = ContractAnalysis.objects.create(
-            contract=contract
-        )
         logger.info(f"✓ ContractAnalysis created with ID: {contract_analysis.id}")
         
+        # Hand the upload's bytes to the analysis so it doesn't read the
+        # just-saved file back from disk (the upload is closed after the
+        # response, so read it now)
+        contract_file.seek(0)
+        contract_data = contract_file.read()
+        
         # Initialize analysis service
+        # Shared per process, so the Groq HTTP connections are reused
         logger.info("Initializing ContractAnalysisService...")
         try:
-            service = ContractAnalysisService()
+            service = get_analysis_service()
             logger.info("✓ ContractAnalysisService initialized successfully")
         except Exception as e:
             logger.error(f"✗ Failed to initialize ContractAnalysisService: {str(e)}", exc_info=True)
             logger.error(f"  Check: GROQ_API_KEY environment variable is set?")
             raise
         
-        # Start analysis in background thread to avoid timeout
+        # Queue analysis on the shared worker pool to avoid timeout
         def run_analysis():
+            # Pool threads live for the whole process, so drop connections
+            # the database may already have timed out (MySQL wait_timeout)
+            close_old_connections()
             logger.info("="*80)
             logger.info(f"BACKGROUND ANALYSIS THREAD STARTED for analysis_id={contract_analysis.id}")
             logger.info("="*80)
@@ -622,7 +632,8 @@ def upload_and_analyze_contract(request):
                     contract_analysis_id=contract_analysis.id,
                     contract_type=contract_type,
                     jurisdiction=jurisdiction,
-                    llm_model=llm_model
+                    llm_model=llm_model,
+                    contract_data=contract_data
                 )
                 logger.info("="*80)
                 logger.info(f"✓ ANALYSIS COMPLETED SUCCESSFULLY for analysis_id={result.get('analysis_id')}")
@@ -635,12 +646,13 @@ def upload_and_analyze_contract(request):
                 logger.error(f"  Error: {str(e)}")
                 logger.error(f"  Type: {type(e).__name__}")
                 logger.error("="*80, exc_info=True)
+            finally:
+                close_old_connections()
         
-        # Run in background thread
-        logger.info(f"Starting background thread for analysis...")
-        analysis_thread = Thread(target=run_analysis, daemon=True)
-        analysis_thread.start()
-        logger.info(f"✓ Background thread started (Thread ID: {analysis_thread.ident})")
+        # Run on the analysis pool; status stays pending until a worker picks it up
+        logger.info(f"Queueing background analysis...")
+        get_analysis_executor().submit(run_analysis)
+        logger.info(f"✓ Analysis queued (analysis_id={contract_analysis.id})")
         
         return JsonResponse({
             'status': 'success',
@@ -784,6 +796,8 @@ def get_user_contracts(request):
                     "name": "Service Agreement",
                     "type": "SERVICE_AGREEMENT_INDIA",
                     "uploaded_at": "2026-01-17T10:30:45",
+                    "high_risk_count": 2,
+                    "avg_similarity": 0.81,
                     "analysis_status": "completed",
                     "analysis_id": 1
                 }
@@ -792,12 +806,14 @@ def get_user_contracts(request):
     """
     try:
         # Get user's contracts
-        contracts = Contract.objects.filter(user=request.user).order_by('-uploaded_at')
+        contracts = Contract.objects.filter(
+            user=request.user
+        ).list_view().with_relations().order_by('-uploaded_at')
         
         contracts_data = []
         
         for contract in contracts:
-            # Get latest analysis for this contract
+            # Get latest analysis for this contract (prefetched, newest first)
             latest_analysis = contract.analysis.first()
             
             contract_data = {
@@ -807,6 +823,8 @@ def get_user_contracts(request):
                 'jurisdiction': contract.jurisdiction,
                 'uploaded_at': contract.uploaded_at.isoformat(),
                 'llm_model': contract.llm_model,
+                'high_risk_count': contract.high_risk_count,
+                'avg_similarity': contract.avg_similarity,
                 'analysis_status': latest_analysis.extraction_status if latest_analysis else 'pending',
                 'analysis_id': latest_analysis.id if latest_analysis else None
             }